@@ -3,16 +3,19 @@ import os
 import platform
 import psutil
 from datetime import datetime
-from asyncio import sleep, get_event_loop
+from asyncio import sleep, get_event_loop, CancelledError
 from pyrogram import filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from colab_leecher import colab_bot, OWNER
 from colab_leecher.utility.handler import cancelTask
 from colab_leecher.utility.variables import (
-    BOT, MSG, BotTimes, Paths, Messages, ProcessTracker, TaskInfo,
+    BOT, MSG, BotTimes, Paths, Messages, ProcessTracker, Task, TaskInfo,
 )
 from colab_leecher.utility.task_manager import taskScheduler
+from colab_leecher.utility.job_queue import Job, JobQueue
+from colab_leecher.utility.disk import DiskBudget
+from colab_leecher.utility.hwaccel import HWAccel
 from colab_leecher.utility.helper import (
     isLink, setThumbnail, message_deleter, send_settings,
     sizeUnit, getTime, is_ytdl_link, _pct_bar, _speed_emoji,
@@ -75,8 +78,11 @@ async def help_cmd(client, message):
         "  /stats     — system resources\n"
         "  /ping      — latency test\n"
         "  /cancel    — cancel running task\n"
+        "  /queue     — queued jobs (reorder / remove)\n"
+        "  /queue_remove <id>       — drop a job\n"
+        "  /queue_move <id> <pos>   — reorder a job\n"
         "  /stop      — shutdown bot\n"
-        "  /setname   — custom filename\n"
+        "  /setname   — custom filename (#id: running job)\n"
         "  /rename    — rename after download\n\n"
         "━━━━━━━━━━━━━━━━━━━━━━━━\n"
         "📡 <b>Nyaa Anime Search</b>\n"
@@ -118,42 +124,14 @@ def _status_panel() -> str:
         "",
     ]
 
-    # ── Active task section ───────────────────
-    if BOT.State.task_going:
-        phase_icons = {
-            "download": "📥", "upload": "📤", "process": "⚙️",
-            "zip": "🗜", "extract": "📂",
-        }
-        icon   = phase_icons.get(TaskInfo.phase, "⏳")
-        engine = TaskInfo.engine or "—"
-        fname  = TaskInfo.filename or Messages.download_name or "—"
-        fname  = (fname[:35] + "…") if len(fname) > 35 else fname
-        pct    = TaskInfo.percentage
-        speed  = TaskInfo.speed or "—"
-        eta    = TaskInfo.eta or "—"
-        spd_e  = _speed_emoji(speed)
-        bar    = _pct_bar(pct, 14)
-
-        elapsed = getTime((datetime.now() - BotTimes.task_start).seconds)
-
-        lines += [
-            f"{icon}  <b>{TaskInfo.phase.upper()}</b>  ·  <code>{engine}</code>",
-            f"🏷  <code>{fname}</code>",
-            "",
-            f"<code>[{bar}]</code>  <b>{pct:.1f}%</b>",
-            "",
-            f"{spd_e}  <b>Speed</b>   <code>{speed}</code>",
-            f"⏳  <b>ETA</b>     <code>{eta}</code>",
-            f"🕰  <b>Elapsed</b> <code>{elapsed}</code>",
-        ]
-
-        procs = ProcessTracker.active()
-        if procs:
-            lines.append("")
-            lines.append(f"🔧  <b>Processes</b>  <code>{len(procs)}</code>")
-            for pid, label in procs[:5]:
-                lines.append(f"   · PID {pid}  <code>{label[:25]}</code>")
-    else:
+    # ── Active task sections ──────────────────
+    for task in Task.running():
+        with task.entered():
+            lines += _task_section(task)
+    shared = ProcessTracker.active()  # not any one job's, e.g. the aria2 daemon
+    if Task.running() and shared:
+        lines += [f"🔗  <b>Shared</b>  <code>{', '.join(l[:20] for _, l in shared)}</code>", ""]
+    if not Task.running():
         lines += [
             "💤  <b>No active task</b>",
             "",
@@ -175,27 +153,69 @@ def _status_panel() -> str:
     return "\n".join(lines)
 
 
+def _task_section(task: Task) -> list:
+    """Status lines of ``task``; call it with the task entered."""
+    phase_icons = {
+        "download": "📥", "upload": "📤", "process": "⚙️",
+        "zip": "🗜", "extract": "📂",
+    }
+    icon   = phase_icons.get(TaskInfo.phase, "⏳")
+    engine = TaskInfo.engine or "—"
+    fname  = TaskInfo.filename or Messages.download_name or "—"
+    fname  = (fname[:35] + "…") if len(fname) > 35 else fname
+    pct    = TaskInfo.percentage
+    speed  = TaskInfo.speed or "—"
+    eta    = TaskInfo.eta or "—"
+    spd_e  = _speed_emoji(speed)
+    bar    = _pct_bar(pct, 14)
+
+    elapsed = getTime((datetime.now() - BotTimes.task_start).seconds)
+
+    lines = [
+        f"🧵  <b>Job #{task.id}</b>",
+        f"{icon}  <b>{TaskInfo.phase.upper()}</b>  ·  <code>{engine}</code>",
+        f"🏷  <code>{fname}</code>",
+        "",
+        f"<code>[{bar}]</code>  <b>{pct:.1f}%</b>",
+        "",
+        f"{spd_e}  <b>Speed</b>   <code>{speed}</code>",
+        f"⏳  <b>ETA</b>     <code>{eta}</code>",
+        f"🕰  <b>Elapsed</b> <code>{elapsed}</code>",
+    ]
+
+    procs = ProcessTracker.active()
+    if procs:
+        lines.append("")
+        lines.append(f"🔧  <b>Processes</b>  <code>{len(procs)}</code>")
+        for pid, label in procs[:5]:
+            lines.append(f"   · PID {pid}  <code>{label[:25]}</code>")
+    lines.append("")
+    return lines
+
+
 def _status_kb() -> InlineKeyboardMarkup:
     rows = []
-    if BOT.State.task_going:
+    if Task.running():
         rows.append([
-            InlineKeyboardButton("⛔ CANCEL TASK", callback_data="status_cancel"),
-            InlineKeyboardButton("🔄 Refresh",     callback_data="status_refresh"),
+            InlineKeyboardButton("⛔ CANCEL ALL", callback_data="status_cancel"),
+            InlineKeyboardButton("🔄 Refresh",    callback_data="status_refresh"),
         ])
         # Kill individual processes
-        procs = ProcessTracker.active()
-        if procs:
-            row = []
-            for pid, label in procs[:4]:
-                short = label[:10] if label else str(pid)
-                row.append(InlineKeyboardButton(
-                    f"💀 {short}", callback_data=f"status_kill|{pid}",
-                ))
-                if len(row) == 2:
-                    rows.append(row)
-                    row = []
-            if row:
+        procs = []
+        for task in Task.running():
+            with task.entered():
+                procs += [(task.id, pid, label) for pid, label in ProcessTracker.active()]
+        row = []
+        for tid, pid, label in procs[:4]:
+            short = label[:10] if label else str(pid)
+            row.append(InlineKeyboardButton(
+                f"💀 {short}", callback_data=f"status_kill|{pid}|{tid}",
+            ))
+            if len(row) == 2:
                 rows.append(row)
+                row = []
+        if row:
+            rows.append(row)
     else:
         rows.append([
             InlineKeyboardButton("🔄 Refresh", callback_data="status_refresh"),
@@ -232,7 +252,7 @@ async def stats(client, message):
         f"🖥  <b>OS</b>      <code>{platform.system()} {platform.release()}</code>\n"
         f"🐍  <b>Python</b>  <code>v{platform.python_version()}</code>\n"
         f"⏱  <b>Uptime</b>  <code>{getTime(up_s)}</code>\n"
-        f"🤖  <b>Task</b>    {'🟠 Running' if BOT.State.task_going else '⚪ Idle'}\n\n"
+        f"🤖  <b>Tasks</b>   {f'🟠 {len(Task.running())} running' if Task.running() else '⚪ Idle'}\n\n"
         f"━━━━━━━━━━━━━━━━━━━━━━━━\n"
         f"{_ring(cpu)}  CPU  <code>[{_pct_bar(cpu,12)}]</code>  <b>{cpu:.1f}%</b>\n\n"
         f"{_ring(ram.percent)}  RAM  <code>[{_pct_bar(ram.percent,12)}]</code>  <b>{ram.percent:.1f}%</b>\n"
@@ -281,9 +301,8 @@ async def ping(client, message):
 async def cancel_cmd(client, message):
     if not _owner(message): return
     await message.delete()
-    if BOT.State.task_going:
-        await cancelTask("Cancelled via /cancel")
-    else:
+    tid = message.command[1].lstrip("#") if len(message.command) > 1 else ""
+    if not await _cancel_jobs("Cancelled via /cancel", int(tid) if tid.isdigit() else None):
         msg = await message.reply_text("⚠️ No active task.")
         await sleep(8); await msg.delete()
 
@@ -292,12 +311,71 @@ async def cancel_cmd(client, message):
 async def stop_bot(client, message):
     if not _owner(message): return
     await message.delete()
-    if BOT.State.task_going:
-        await cancelTask("Bot shutdown")
+    await _cancel_jobs("Bot shutdown")
     await message.reply_text("🛑 <b>Shutting down...</b> 👋")
     await sleep(2); await client.stop(); os._exit(0)
 
 
+# ══════════════════════════════════════════════
+#  /queue — pending jobs
+# ══════════════════════════════════════════════
+
+def _queue_panel():
+    jobs = JobQueue.all()
+    lines = ["📋 <b>JOB QUEUE</b>", "━━━━━━━━━━━━━━━━━━━━━━━━", ""]
+    for task in Task.running():
+        with task.entered():
+            lines.append(f"🟠 <b>Running #{task.id}</b>  <code>{Messages.download_name or '…'}</code>")
+    if Task.running():
+        lines.append("")
+    if not jobs:
+        lines.append("<i>No jobs waiting.</i>")
+    rows = []
+    for i, j in enumerate(jobs, 1):
+        lines.append(f"<b>{i}.</b> #{j.id} · {j.type} · <code>{j.label}</code>")
+        rows.append([
+            InlineKeyboardButton(f"⬆️ #{j.id}", callback_data=f"q_up_{j.id}"),
+            InlineKeyboardButton(f"❌ #{j.id}", callback_data=f"q_rm_{j.id}"),
+        ])
+    rows.append([InlineKeyboardButton("❌ Close", callback_data="close")])
+    return "\n".join(lines), InlineKeyboardMarkup(rows)
+
+
+@colab_bot.on_message(filters.command("queue") & filters.private)
+async def queue_cmd(client, message):
+    if not _owner(message): return
+    await message.delete()
+    text, markup = _queue_panel()
+    await message.reply_text(text, reply_markup=markup)
+
+
+@colab_bot.on_message(filters.command("queue_remove") & filters.private)
+async def queue_remove(client, message):
+    if not _owner(message): return
+    if len(message.command) != 2 or not message.command[1].lstrip("#").isdigit():
+        msg = await message.reply_text("Usage: <code>/queue_remove id</code>", quote=True)
+    elif JobQueue.remove(int(message.command[1].lstrip("#"))):
+        msg = await message.reply_text("🗑 Job removed.", quote=True)
+    else:
+        msg = await message.reply_text("❌ No such job in the queue.", quote=True)
+    await sleep(15); await message_deleter(message, msg)
+
+
+@colab_bot.on_message(filters.command("queue_move") & filters.private)
+async def queue_move(client, message):
+    if not _owner(message): return
+    args = [a.lstrip("#") for a in message.command[1:]]
+    if len(args) != 2 or not all(a.isdigit() for a in args):
+        msg = await message.reply_text("Usage: <code>/queue_move id position</code>", quote=True)
+    elif JobQueue.move(int(args[0]), int(args[1])):
+        msg = await message.reply_text(
+            f"↕️ Job #{args[0]} → position <code>{JobQueue.position(int(args[0]))}</code>", quote=True
+        )
+    else:
+        msg = await message.reply_text("❌ No such job in the queue.", quote=True)
+    await sleep(15); await message_deleter(message, msg)
+
+
 @colab_bot.on_message(filters.command("settings") & filters.private)
 async def settings_cmd(client, message):
     if _owner(message):
@@ -305,49 +383,89 @@ async def settings_cmd(client, message):
         await send_settings(client, message, message.id, True)
 
 
+def _job_arg(args: list):
+    """Split a trailing ``#id`` job argument off command ``args``."""
+    if len(args) > 1 and args[-1].startswith("#") and args[-1][1:].isdigit():
+        return args[:-1], int(args[-1][1:])
+    return args, None
+
+
+def _set_option(name: str, value: str, jid=None):
+    """
+    Put an option on running job ``jid``, or else on the pending link.
+    Returns what took it ("job #3" / "the pending link"), None if nothing did.
+    """
+    if jid is not None:
+        task = Task.get(jid)
+        if task is None:
+            return None
+        with task.entered():
+            setattr(BOT.Options, name, value)
+        return f"job #{jid}"
+    if JobQueue.setOption(name, value):
+        return "the pending link"
+    return None
+
+
+def _no_target(jid) -> str:
+    if jid is not None:
+        return f"❌ No running job <code>#{jid}</code>"
+    return ("⚠️ No pending link to apply it to.\n"
+            "Send a link first, or add <code>#id</code> for a running job.")
+
+
 @colab_bot.on_message(filters.command("setname") & filters.private)
 async def custom_name(client, message):
-    if len(message.command) != 2:
-        msg = await message.reply_text("Usage: <code>/setname file.ext</code>", quote=True)
+    args, jid = _job_arg(message.command[1:])
+    if len(args) != 1:
+        msg = await message.reply_text("Usage: <code>/setname file.ext [#id]</code>", quote=True)
+    elif target := _set_option("custom_name", args[0], jid):
+        msg = await message.reply_text(f"✅ Name → <code>{args[0]}</code> for {target}", quote=True)
     else:
-        BOT.Options.custom_name = message.command[1]
-        msg = await message.reply_text(f"✅ Name → <code>{BOT.Options.custom_name}</code>", quote=True)
+        msg = await message.reply_text(_no_target(jid), quote=True)
     await sleep(15); await message_deleter(message, msg)
 
 
 @colab_bot.on_message(filters.command("rename") & filters.private)
 async def rename_cmd(client, message):
-    """Minimal rename — set name for next upload."""
-    if len(message.command) < 2:
+    """Minimal rename — set name for the pending link or a running job."""
+    args, jid = _job_arg(message.command[1:])
+    if not args:
         return await message.reply_text(
-            "✏️ <b>Rename</b>\n\nUsage: <code>/rename New Name.mkv</code>",
+            "✏️ <b>Rename</b>\n\nUsage: <code>/rename New Name.mkv [#id]</code>",
             quote=True,
         )
-    new_name = " ".join(message.command[1:])
-    BOT.Options.custom_name = new_name
+    new_name = " ".join(args)
+    target = _set_option("custom_name", new_name, jid)
+    if target is None:
+        return await message.reply_text(_no_target(jid), quote=True)
     await message.reply_text(
-        f"✅ Next file will be named: <code>{new_name}</code>",
+        f"✅ Files of {target} will be named: <code>{new_name}</code>",
         quote=True,
     )
 
 
 @colab_bot.on_message(filters.command("zipaswd") & filters.private)
 async def zip_pswd(client, message):
-    if len(message.command) != 2:
-        msg = await message.reply_text("Usage: <code>/zipaswd password</code>", quote=True)
+    args, jid = _job_arg(message.command[1:])
+    if len(args) != 1:
+        msg = await message.reply_text("Usage: <code>/zipaswd password [#id]</code>", quote=True)
+    elif target := _set_option("zip_pswd", args[0], jid):
+        msg = await message.reply_text(f"✅ Zip password set for {target} 🔐", quote=True)
     else:
-        BOT.Options.zip_pswd = message.command[1]
-        msg = await message.reply_text("✅ Zip password set 🔐", quote=True)
+        msg = await message.reply_text(_no_target(jid), quote=True)
     await sleep(15); await message_deleter(message, msg)
 
 
 @colab_bot.on_message(filters.command("unzipaswd") & filters.private)
 async def unzip_pswd(client, message):
-    if len(message.command) != 2:
-        msg = await message.reply_text("Usage: <code>/unzipaswd password</code>", quote=True)
+    args, jid = _job_arg(message.command[1:])
+    if len(args) != 1:
+        msg = await message.reply_text("Usage: <code>/unzipaswd password [#id]</code>", quote=True)
+    elif target := _set_option("unzip_pswd", args[0], jid):
+        msg = await message.reply_text(f"✅ Unzip password set for {target} 🔓", quote=True)
     else:
-        BOT.Options.unzip_pswd = message.command[1]
-        msg = await message.reply_text("✅ Unzip password set 🔓", quote=True)
+        msg = await message.reply_text(_no_target(jid), quote=True)
     await sleep(15); await message_deleter(message, msg)
 
 
@@ -363,6 +481,83 @@ async def setFix(client, message):
         await message.delete()
 
 
+# ══════════════════════════════════════════════
+#  Job dispatcher — runs queued jobs back to back
+# ══════════════════════════════════════════════
+
+_jobs_running: set = set()   # asyncio tasks of the jobs in progress
+_stream_dl = None            # asyncio task of the stream extractor download
+
+def _slots_full() -> bool:
+    return len(_jobs_running) >= Task.slots
+
+
+def _ensure_dispatcher():
+    """Start queued jobs while there are free task slots."""
+    while not _slots_full():
+        job = JobQueue.pop()
+        if job is None: return
+        run = get_event_loop().create_task(_run_job(job))
+        _jobs_running.add(run)
+        run.add_done_callback(_job_done)
+
+
+def _job_done(run):
+    _jobs_running.discard(run)
+    if not run.cancelled() and run.exception():
+        logging.error(f"Job failed: {run.exception()}")
+    _ensure_dispatcher()
+
+
+async def _cancel_jobs(reason: str, tid: int = None) -> int:
+    """Cancel job ``tid``, or every running one; returns how many."""
+    tasks = [t for t in Task.running() if tid is None or t.id == tid]
+    for task in tasks:
+        with task.entered():
+            await cancelTask(reason)
+    return len(tasks)
+
+
+async def _run_job(job: Job):
+    """Run ``job`` in its own Task state, to the end (or /cancel)."""
+    while not colab_bot.is_connected:   # jobs restored at startup
+        await sleep(1)
+    task = Task(job.id)
+    try:
+        with task.entered():
+            BOT.SOURCE    = job.sources
+            BOT.Mode.type = job.type
+            BOT.Mode.mode = job.mode
+            BOT.Mode.ytdl = job.ytdl
+            BOT.Options.custom_name = job.custom_name
+            BOT.Options.zip_pswd    = job.zip_pswd
+            BOT.Options.unzip_pswd  = job.unzip_pswd
+
+            MSG.status_msg = await colab_bot.send_message(
+                chat_id=OWNER, text=f"⏳ <i>Starting job #{job.id}...</i>",
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton("⛔ Cancel", callback_data=f"cancel_{job.id}"),
+                    InlineKeyboardButton("📊 Status", callback_data="status_refresh"),
+                ]]),
+            )
+            BOT.State.task_going = True
+            BOT.State.started    = False
+            BotTimes.start_time  = datetime.now()
+            TaskInfo.reset()
+            TaskInfo.set(phase="download", started_at=datetime.now().timestamp())
+            BOT.TASK = get_event_loop().create_task(taskScheduler())
+            try:
+                await BOT.TASK
+            except CancelledError:
+                if not BOT.TASK.cancelled(): raise  # the job itself is stopping
+            finally:
+                BOT.State.task_going = False
+                TaskInfo.reset()
+    finally:
+        DiskBudget.release(task)
+        task.close()
+
+
 # ══════════════════════════════════════════════
 #  Link handler — mode selection
 # ══════════════════════════════════════════════
@@ -380,36 +575,30 @@ def _mode_keyboard():
 @colab_bot.on_message(filters.create(isLink) & ~filters.photo & filters.private)
 async def handle_url(client, message):
     if not _owner(message): return
-    BOT.Options.custom_name = ""
-    BOT.Options.zip_pswd    = ""
-    BOT.Options.unzip_pswd  = ""
-
-    if BOT.State.task_going:
-        msg = await message.reply_text("⚠️ Task running — /cancel first.", quote=True)
-        await sleep(8); await msg.delete()
-        return
 
+    # Options go on a draft job, never on BOT — a task may be running
     src = message.text.splitlines()
+    job = Job(sources=src)
     for _ in range(3):
         if not src: break
         last = src[-1].strip()
-        if   last.startswith("[") and last.endswith("]"): BOT.Options.custom_name = last[1:-1]; src.pop()
-        elif last.startswith("{") and last.endswith("}"): BOT.Options.zip_pswd    = last[1:-1]; src.pop()
-        elif last.startswith("(") and last.endswith(")"): BOT.Options.unzip_pswd  = last[1:-1]; src.pop()
+        if   last.startswith("[") and last.endswith("]"): job.custom_name = last[1:-1]; src.pop()
+        elif last.startswith("{") and last.endswith("}"): job.zip_pswd    = last[1:-1]; src.pop()
+        elif last.startswith("(") and last.endswith(")"): job.unzip_pswd  = last[1:-1]; src.pop()
         else: break
 
-    BOT.SOURCE    = src
-    BOT.Mode.ytdl = all(is_ytdl_link(l) for l in src if l.strip())
-    BOT.Mode.mode = "leech"
-    BOT.State.started = True
+    job.ytdl = all(is_ytdl_link(l) for l in src if l.strip())
 
     n     = len([l for l in src if l.strip()])
-    label = "🏮 YTDL" if BOT.Mode.ytdl else "🔗 Link"
+    label = "🏮 YTDL" if job.ytdl else "🔗 Link"
+    if _slots_full():
+        label += "  ·  ⏳ will be queued"
 
-    await message.reply_text(
+    prompt = await message.reply_text(
         f"{label}  ·  <code>{n}</code> source(s)\n<b>Choose mode:</b>",
         reply_markup=_mode_keyboard(), quote=True,
     )
+    JobQueue.putDraft(prompt.id, job)
 
 
 # ══════════════════════════════════════════════
@@ -470,7 +659,7 @@ async def callbacks(client, cq):
 
     if data == "status_cancel":
         await cq.answer("⛔ Cancelling ALL tasks…")
-        await cancelTask("Cancelled via /status panel")
+        await _cancel_jobs("Cancelled via /status panel")
         try:
             await cq.message.edit_text(
                 _status_panel(),
@@ -481,17 +670,19 @@ async def callbacks(client, cq):
         return
 
     if data.startswith("status_kill|"):
-        pid = int(data.split("|")[1])
+        _, pid, tid = data.split("|")
+        pid, task = int(pid), Task.get(int(tid))
         import signal
         try:
             os.kill(pid, signal.SIGTERM)
-            ProcessTracker.unregister(pid)
             await cq.answer(f"💀 Killed PID {pid}")
         except ProcessLookupError:
-            ProcessTracker.unregister(pid)
             await cq.answer("Process already dead.")
         except Exception as e:
             await cq.answer(f"Kill failed: {e}", show_alert=True)
+        if task:
+            with task.entered():
+                ProcessTracker.unregister(pid)
         try:
             await cq.message.edit_text(_status_panel(), reply_markup=_status_kb())
         except Exception:
@@ -525,24 +716,34 @@ async def callbacks(client, cq):
 
     # ── Task launch ────────────────────────────
     if data in ["normal", "zip", "unzip", "undzip"]:
-        BOT.Mode.type = data
-        await cq.message.delete()
-        MSG.status_msg = await colab_bot.send_message(
-            chat_id=OWNER, text="⏳ <i>Starting...</i>",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("⛔ Cancel", callback_data="cancel"),
-                InlineKeyboardButton("📊 Status", callback_data="status_refresh"),
-            ]]),
-        )
-        BOT.State.task_going = True
-        BOT.State.started    = False
-        BotTimes.start_time  = datetime.now()
-        TaskInfo.reset()
-        TaskInfo.set(phase="download", started_at=datetime.now().timestamp())
-        BOT.TASK = get_event_loop().create_task(taskScheduler())
-        await BOT.TASK
-        BOT.State.task_going = False
-        TaskInfo.reset()
+        job = JobQueue.takeDraft(cq.message.id)
+        if job is None:
+            await cq.answer("No link pending — send it again.", show_alert=True); return
+        job.type = data
+        busy     = _slots_full()
+        position = JobQueue.add(job)
+        if busy:
+            await cq.message.edit_text(
+                f"📋 <b>Queued #{job.id}</b>  ·  position <code>{position}</code>\n"
+                f"<code>{job.label}</code>\n\n<i>/queue to reorder or remove</i>"
+            )
+        else:
+            await cq.message.delete()
+        _ensure_dispatcher()
+        return
+
+    # ── Job queue ──────────────────────────────
+    if data.startswith("q_"):
+        _, action, jid = data.split("_")
+        jid = int(jid)
+        if action == "up":
+            ok = JobQueue.move(jid, JobQueue.position(jid) - 1)
+        else:
+            ok = JobQueue.remove(jid)
+        await cq.answer("✅ Done" if ok else "Job already started or removed.")
+        text, markup = _queue_panel()
+        try: await cq.message.edit_text(text, reply_markup=markup)
+        except Exception: pass
         return
 
     # ════════════════════════════════════════════
@@ -550,7 +751,8 @@ async def callbacks(client, cq):
     # ════════════════════════════════════════════
 
     if data == "sx_open":
-        url = (BOT.SOURCE or [None])[0]
+        job = JobQueue.draft(cq.message.id)
+        url = (job.sources if job else [None])[0]
         if not url:
             await cq.answer("No URL found.", show_alert=True); return
 
@@ -618,8 +820,9 @@ async def callbacks(client, cq):
 
     if data == "sx_back":
         clear_session(chat_id)
-        n     = len([l for l in (BOT.SOURCE or []) if l.strip()])
-        label = "🏮 YTDL" if BOT.Mode.ytdl else "🔗 Link"
+        job   = JobQueue.draft(cq.message.id) or Job(sources=[])
+        n     = len([l for l in job.sources if l.strip()])
+        label = "🏮 YTDL" if job.ytdl else "🔗 Link"
         await cq.message.edit_text(
             f"{label}  ·  <code>{n}</code> source(s)\n<b>Choose mode:</b>",
             reply_markup=_mode_keyboard()
@@ -630,6 +833,8 @@ async def callbacks(client, cq):
     if data.startswith("sx_dl_"):
         session = get_session(chat_id)
         if not session: await cq.answer("Session expired.", show_alert=True); return
+        if Task.running():
+            await cq.answer("⚠️ A task is running — try again once it ends.", show_alert=True); return
 
         parts = data.split("_")
         kind  = parts[2]
@@ -644,13 +849,12 @@ async def callbacks(client, cq):
             f"⬇️ <i>Downloading {kind}...</i>\n\n"
             f"<code>{stream['label']}</code>",
             reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("⛔ Cancel", callback_data="cancel")
+                InlineKeyboardButton("⛔ Cancel", callback_data="sx_cancel")
             ]])
         )
         MSG.status_msg = cq.message
 
-        os.makedirs(Paths.down_path, exist_ok=True)
-        try:
+        async def stream_dl():
             if kind == "video":
                 fp = await dl_video(session, idx, Paths.down_path)
             elif kind == "audio":
@@ -662,6 +866,20 @@ async def callbacks(client, cq):
             await upload_file(fp, os.path.basename(fp), is_last=True)
             clear_session(chat_id)
 
+        os.makedirs(Paths.down_path, exist_ok=True)
+        global _stream_dl
+        _stream_dl = get_event_loop().create_task(stream_dl())
+        try:
+            await _stream_dl
+        except CancelledError:
+            if not _stream_dl.cancelled():
+                raise
+            try:
+                await cq.message.edit_text(
+                    "🎞 <b>STREAM EXTRACTOR</b>\n━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+                    "⛔ <b>Cancelled</b>"
+                )
+            except Exception: pass
         except Exception as e:
             logging.error(f"[StreamDL] {e}")
             try:
@@ -746,8 +964,17 @@ async def callbacks(client, cq):
         await cq.message.delete()
     elif data == "back":
         await send_settings(client, cq.message, cq.message.id, False)
+    elif data.startswith("cancel_"):
+        if not await _cancel_jobs("Cancelled by user", int(data.split("_")[1])):
+            await cq.answer("Job already finished.")
     elif data == "cancel":
-        await cancelTask("Cancelled by user")
+        if not await _cancel_jobs("Cancelled by user"):
+            await cq.answer("No active task.")
+    elif data == "sx_cancel":
+        if _stream_dl is None or _stream_dl.done():
+            await cq.answer("Download already finished.")
+        else:
+            _stream_dl.cancel()
 
 
 async def _show_type_menu(msg, session):
@@ -793,5 +1020,12 @@ except Exception as e:
     logging.warning(f"Nyaa tracker not loaded: {e}")
 
 
+# Probe ffmpeg encoders / GPUs once, before the first conversion needs them
+HWAccel.detect()
+
+# Pick up jobs still queued from before a restart
+if JobQueue.all():
+    _ensure_dispatcher()
+
 logging.info("⚡ Zilong started.")
 colab_bot.run()
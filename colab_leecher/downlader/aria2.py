@@ -1,16 +1,26 @@
 import re
 import logging
-import subprocess
+from time import time
+from os import path as ospath
 from datetime import datetime
-from colab_leecher.utility.helper import sizeUnit, status_bar
+from asyncio import sleep, ensure_future, create_subprocess_exec, CancelledError
+from asyncio import subprocess as asyncio_subprocess
+from colab_leecher.downlader.aria2_rpc import Aria2RPC
+from colab_leecher.downlader.link_info import resolveLink
+from colab_leecher.utility.checkpoint import Checkpoints, sourceOf
+from colab_leecher.utility.disk import DiskGuard
+from colab_leecher.utility.helper import sizeUnit, status_bar, getTime
 from colab_leecher.utility.variables import (
-    BOT, Aria2c, Paths, Messages, BotTimes, ProcessTracker, TaskInfo,
+    BOT, Aria2c, Paths, Messages, BotTimes, ProcessTracker, TaskInfo, Transfer,
 )
 
+PARSE_INTERVAL = 1.0  # seconds between parsed aria2c summary lines
+RPC_RETRIES = 3       # failed status calls in a row before the link is given up
+
 
 async def aria2_Download(link: str, num: int):
     global BotTimes, Messages
-    name_d = get_Aria2c_Name(link)
+    name_d = await get_Aria2c_Name(link)
     BotTimes.task_start = datetime.now()
     Messages.status_head = f"<b>📥 DOWNLOADING FROM » </b><i>🔗Link {str(num).zfill(2)}</i>\n\n<b>🏷️ Name » </b><code>{name_d}</code>\n"
 
@@ -20,9 +30,122 @@ async def aria2_Download(link: str, num: int):
         filename=name_d, started_at=datetime.now().timestamp(),
     )
 
+    if await Aria2RPC.start():
+        await aria2_RPC_Download(link, num)
+    else:
+        await aria2_Spawn_Download(link, num, name_d)
+
+
+async def aria2_RPC_Download(link: str, num: int):
+    gid = await Aria2RPC.add(link, Paths.down_path)
+    try:
+        await aria2_RPC_Poll(gid, link, num)
+    except CancelledError:
+        await Aria2RPC.remove(gid)  # the daemon is shared with other tasks
+        raise
+
+
+async def aria2_RPC_Poll(gid: str, link: str, num: int):
+    checkpoint = f"aria2:{link}"
+    pinned = False
+
+    failures = 0
+
+    while True:
+        try:
+            status = await Aria2RPC.status(gid)
+        except Exception as e:
+            # A lost daemon doesn't come back: fail the link after a few tries
+            failures += 1
+            if failures >= RPC_RETRIES:
+                raise IOError(f"aria2 RPC stopped answering: {e}") from e
+            await sleep(1)
+            continue
+        failures = 0
+
+        # Magnets and .torrent URLs hand over to a new GID once metadata is in
+        if status.get("followedBy"):
+            gid = status["followedBy"][0]
+            continue
+
+        state = status["status"]
+        # Hold the download while the disk is nearly full and uploads free it
+        room = DiskGuard.check()
+        try:
+            if not room and state == "active":
+                await Aria2RPC.pause(gid)
+            elif room and state == "paused":
+                await Aria2RPC.unpause(gid)
+        except Exception as e:
+            logging.warning(f"[Aria2RPC] pause/unpause {gid}: {e}")
+
+        if state == "complete":
+            Transfer.down_bytes.append(int(status["completedLength"]))
+            Checkpoints.finish(checkpoint)
+            break
+        if state in ("error", "removed"):
+            raise IOError(log_Aria2c_Error(
+                int(status.get("errorCode", 1)), link, status.get("errorMessage", "")
+            ))
+
+        total = int(status["totalLength"])
+        done = int(status["completedLength"])
+        speed = int(status["downloadSpeed"])
+        elapsed_time_seconds = (datetime.now() - BotTimes.task_start).seconds
+
+        if num in Transfer.live:
+            Transfer.live[num] = done
+
+        if total and not pinned:
+            # Keep the partial file and its control file if the task dies
+            Checkpoints.begin(checkpoint, sourceOf(num), aria2_Target(status), total)
+            pinned = True
+
+        if total:
+            Aria2c.link_info = True
+            percentage = done / total * 100
+            eta = getTime((total - done) / speed) if speed else "N/A"
+            speed_string = f"{sizeUnit(speed)}/s"
+
+            # Update TaskInfo for /status
+            TaskInfo.set(
+                done_bytes=done,
+                total_bytes=total,
+                percentage=percentage,
+                speed=speed_string,
+                eta=eta,
+            )
+
+            await status_bar(
+                Messages.status_head,
+                speed_string,
+                percentage,
+                eta,
+                sizeUnit(done),
+                sizeUnit(total),
+                "Aria2c 🧨",
+            )
+        elif elapsed_time_seconds >= 270 and not Aria2c.link_info:
+            logging.error("Failed to get download information ! Probably dead link 💀")
+
+        await sleep(1)
+
+
+def aria2_Target(status: dict) -> str:
+    """Top-level path of an aria2 download: the file, or the torrent's folder."""
+    info = status.get("bittorrent", {}).get("info")
+    if info and info.get("name"):
+        return ospath.join(status["dir"], info["name"])
+    return status["files"][0]["path"]
+
+
+async def aria2_Spawn_Download(link: str, num: int, name_d: str):
+    checkpoint = f"aria2:{link}"
+    Checkpoints.begin(checkpoint, sourceOf(num), ospath.join(Paths.down_path, name_d), 0)
     command = [
         "aria2c",
         "-x16",
+        "--continue=true",
         "--seed-time=0",
         "--summary-interval=1",
         "--max-tries=3",
@@ -32,52 +155,63 @@ async def aria2_Download(link: str, num: int):
         link,
     ]
 
-    proc = subprocess.Popen(
-        command, bufsize=0, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    proc = await create_subprocess_exec(
+        *command, stdout=asyncio_subprocess.PIPE, stderr=asyncio_subprocess.PIPE
     )
 
     # ── REGISTER PID so cancelTask() can kill it ──────────────
     ProcessTracker.register(proc.pid, f"aria2c: {name_d[:30]}")
 
-    while True:
-        output = proc.stdout.readline()
-        if output == b"" and proc.poll() is not None:
-            break
-        if output:
-            await on_output(output.decode("utf-8"))
+    # Drain stderr alongside stdout so a full pipe can't stall aria2c
+    stderr_task = ensure_future(proc.stderr.read())
+
+    last_parse = 0.0
+    async for output in proc.stdout:
+        # One summary line per second; only hand over the ones the
+        # status bar will render instead of parsing every notice line
+        line = output.decode("utf-8", errors="ignore")
+        if "ETA:" not in line or time() - last_parse < PARSE_INTERVAL:
+            continue
+        last_parse = time()
+        await on_output(line, num)
+
+    exit_code = await proc.wait()
+    error_output = (await stderr_task).decode("utf-8", errors="ignore")
 
     # ── UNREGISTER when done ──────────────────────────────────
     ProcessTracker.unregister(proc.pid)
 
-    exit_code = proc.wait()
-    error_output = proc.stderr.read()
     if exit_code != 0:
-        if exit_code == 3:
-            logging.error(f"The Resource was Not Found in {link}")
-        elif exit_code == 9:
-            logging.error(f"Not enough disk space available")
-        elif exit_code == 24:
-            logging.error(f"HTTP authorization failed.")
-        else:
-            logging.error(
-                f"aria2c download failed with return code {exit_code} for {link}.\nError: {error_output}"
-            )
+        raise IOError(log_Aria2c_Error(exit_code, link, error_output))
+    Checkpoints.finish(checkpoint)
+    if num in Transfer.live:
+        Transfer.down_bytes.append(Transfer.live[num])
 
 
-def get_Aria2c_Name(link):
+def log_Aria2c_Error(exit_code: int, link: str, error_output) -> str:
+    """Log why aria2c failed on ``link`` and return the reason."""
+    if exit_code == 3:
+        error = f"The Resource was Not Found in {link}"
+    elif exit_code == 9:
+        error = "Not enough disk space available"
+    elif exit_code == 24:
+        error = "HTTP authorization failed."
+    else:
+        error = f"aria2c download failed with return code {exit_code} for {link}.\nError: {error_output}"
+    logging.error(error)
+    return error
+
+
+async def get_Aria2c_Name(link):
     if len(BOT.Options.custom_name) != 0:
         return BOT.Options.custom_name
-    cmd = f'aria2c -x10 --dry-run --file-allocation=none "{link}"'
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, shell=True)
-    stdout_str = result.stdout.decode("utf-8")
-    filename = stdout_str.split("complete: ")[-1].split("\n")[0]
-    name = filename.split("/")[-1]
+    name = (await resolveLink(link))["name"]
     if len(name) == 0:
         name = "UNKNOWN DOWNLOAD NAME"
     return name
 
 
-async def on_output(output: str):
+async def on_output(output: str, num: int = 0):
     global link_info
     total_size = "0B"
     progress_percentage = "0B"
@@ -108,6 +242,9 @@ async def on_output(output: str):
 
     elapsed_time_seconds = (datetime.now() - BotTimes.task_start).seconds
 
+    if num in Transfer.live:
+        Transfer.live[num] = int(float(down) * 1024**spd)
+
     if elapsed_time_seconds >= 270 and not Aria2c.link_info:
         logging.error("Failed to get download information ! Probably dead link 💀")
 
@@ -0,0 +1,178 @@
+"""
+colab_leecher/downlader/aria2_rpc.py
+One long-lived aria2c daemon driven over JSON-RPC.
+
+Instead of spawning a fresh aria2c per link and scraping its console
+summary, every link is submitted to a single daemon with aria2.addUri /
+aria2.addTorrent and polled with aria2.tellStatus / aria2.tellActive over
+one pooled aiohttp session. Byte counts come straight from aria2, so no
+"MiB" string parsing is needed.
+
+The daemon is shared by every running task, so its PID is registered
+with the shared ProcessTracker rather than a task's: cancelling one task
+removes that task's GIDs and leaves the others downloading. A lone
+cancelled task still kills it, and it is respawned on the next link.
+"""
+import os
+import base64
+import asyncio
+import logging
+import secrets
+import subprocess
+
+import aiohttp
+
+from colab_leecher.utility.variables import Aria2c, ProcessTracker, Task
+
+log = logging.getLogger(__name__)
+
+_STATUS_KEYS = [
+    "gid", "status", "totalLength", "completedLength", "downloadSpeed",
+    "errorCode", "errorMessage", "followedBy", "dir", "files", "bittorrent",
+]
+
+
+class Aria2RPCError(Exception):
+    pass
+
+
+class Aria2RPC:
+    """Singleton handle on the aria2c RPC daemon."""
+    _proc: subprocess.Popen = None
+    _session: aiohttp.ClientSession = None
+    _secret: str = ""
+    _lock: asyncio.Lock = None
+    _seq: int = 0
+
+    @classmethod
+    def url(cls) -> str:
+        return f"http://127.0.0.1:{Aria2c.rpc_port}/jsonrpc"
+
+    @classmethod
+    def alive(cls) -> bool:
+        return cls._proc is not None and cls._proc.poll() is None
+
+    @classmethod
+    async def start(cls) -> bool:
+        """Start the daemon if it is not running. Returns True when usable."""
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            if cls.alive():
+                return True
+            cls._secret = secrets.token_hex(16)
+            command = [
+                "aria2c",
+                "--enable-rpc",
+                "--rpc-listen-all=false",
+                f"--rpc-listen-port={Aria2c.rpc_port}",
+                f"--rpc-secret={cls._secret}",
+                f"--max-concurrent-downloads={Aria2c.max_concurrent}",
+                "--max-connection-per-server=16",
+                "--split=16",
+                "--seed-time=0",
+                "--max-tries=3",
+                "--follow-torrent=mem",
+                "--bt-save-metadata=false",
+                "--console-log-level=warn",
+                "--quiet=true",
+            ]
+            try:
+                cls._proc = subprocess.Popen(
+                    command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            except FileNotFoundError:
+                log.error("[Aria2RPC] aria2c binary not found")
+                cls._proc = None
+                return False
+
+            with Task.detached():  # shared by every task; /cancel removes its GIDs
+                ProcessTracker.register(cls._proc.pid, "aria2c rpc")
+
+            # Wait until the RPC port answers
+            for _ in range(50):
+                if not cls.alive():
+                    break
+                try:
+                    await cls.call("aria2.getVersion")
+                    log.info(f"[Aria2RPC] Daemon ready (PID {cls._proc.pid})")
+                    return True
+                except Exception:
+                    await asyncio.sleep(0.1)
+
+            log.error("[Aria2RPC] Daemon did not come up")
+            await cls.stop()
+            return False
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._proc is not None:
+            with Task.detached():
+                ProcessTracker.unregister(cls._proc.pid)
+            if cls._proc.poll() is None:
+                cls._proc.terminate()
+            cls._proc = None
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+
+    @classmethod
+    def _get_session(cls) -> aiohttp.ClientSession:
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4),
+                timeout=aiohttp.ClientTimeout(total=15),
+            )
+        return cls._session
+
+    @classmethod
+    async def call(cls, method: str, *params):
+        cls._seq += 1
+        payload = {
+            "jsonrpc": "2.0",
+            "id": str(cls._seq),
+            "method": method,
+            "params": [f"token:{cls._secret}", *params],
+        }
+        async with cls._get_session().post(cls.url(), json=payload) as resp:
+            data = await resp.json(content_type=None)
+        if "error" in data:
+            raise Aria2RPCError(data["error"].get("message", str(data["error"])))
+        return data["result"]
+
+    @classmethod
+    async def add(cls, link: str, directory: str) -> str:
+        """Submit a link (URL, magnet or local .torrent) and return its GID."""
+        # Pick up a partial file left by an earlier attempt via its .aria2 control file
+        options = {"dir": directory, "continue": "true"}
+        if link.endswith(".torrent") and os.path.isfile(link):
+            with open(link, "rb") as f:
+                torrent = base64.b64encode(f.read()).decode()
+            return await cls.call("aria2.addTorrent", torrent, [], options)
+        return await cls.call("aria2.addUri", [link], options)
+
+    @classmethod
+    async def status(cls, gid: str) -> dict:
+        return await cls.call("aria2.tellStatus", gid, _STATUS_KEYS)
+
+    @classmethod
+    async def active(cls) -> list:
+        """Status of every download the daemon is currently running."""
+        if not cls.alive():
+            return []
+        return await cls.call("aria2.tellActive", _STATUS_KEYS)
+
+    @classmethod
+    async def pause(cls, gid: str) -> None:
+        await cls.call("aria2.forcePause", gid)
+
+    @classmethod
+    async def unpause(cls, gid: str) -> None:
+        await cls.call("aria2.unpause", gid)
+
+    @classmethod
+    async def remove(cls, gid: str) -> None:
+        try:
+            await cls.call("aria2.forceRemove", gid)
+        except Exception as e:
+            log.debug(f"[Aria2RPC] remove {gid}: {e}")
@@ -1,16 +1,24 @@
-import io
+import os
 import logging
 import pickle
+from threading import Event, Lock, local
+from asyncio import get_running_loop, shield, sleep
+from concurrent.futures import ThreadPoolExecutor
 from natsort import natsorted
 from re import search as re_search
 from os import makedirs, path as ospath
 from urllib.parse import parse_qs, urlparse
 from googleapiclient.discovery import build
+from google.auth.transport.requests import AuthorizedSession
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload
 from colab_leecher.utility.handler import cancelTask
+from colab_leecher.utility.checkpoint import Checkpoints, isCovered, resumeOffset, sourceOf
 from colab_leecher.utility.helper import sizeUnit, getTime, speedETA, status_bar
-from colab_leecher.utility.variables import Gdrive, Messages, Paths, BotTimes, Transfer
+from colab_leecher.utility.disk import DiskGuard
+from colab_leecher.utility.variables import Disk, Gdrive, Messages, Paths, BotTimes, Transfer
+
+_local = local()
+_list_lock = Lock()
 
 
 async def build_service():
@@ -18,8 +26,8 @@ async def build_service():
     if ospath.exists(Paths.access_token):
         with open(Paths.access_token, "rb") as token:
             creds = pickle.load(token)
-            # Build the service
-            Gdrive.service = build("drive", "v3", credentials=creds)
+            # Services are built per thread from these (threadService)
+            Gdrive.creds = creds
     else:
         await cancelTask(
             "token.pickle NOT FOUND ! Stop the Bot and Run the Google Drive Cell to Generate, then Try again !"
@@ -27,15 +35,14 @@ async def build_service():
 
 
 async def g_DownLoad(link, num):
-    global start_time, down_msg
-    down_msg = f"<b>📥 DOWNLOADING FROM » </b><i>🔗Link {str(num).zfill(2)}</i>\n\n<b>🏷️ Name » </b><code>{Messages.download_name}</code>\n"
+    Transfer.down_heads[num] = f"<b>📥 DOWNLOADING FROM » </b><i>🔗Link {str(num).zfill(2)}</i>\n\n<b>🏷️ Name » </b><code>{Messages.download_name}</code>\n"
     file_id = await getIDFromURL(link)
-    meta = getFileMetadata(file_id)
+    meta = await offLoop(getFileMetadata, file_id)
 
-    if meta.get("mimeType") == "application/vnd.google-apps.folder":
-        await gDownloadFolder(file_id, Paths.down_path)
+    if meta.get("mimeType") == FOLDER_MIME:
+        await gDownloadFolder(file_id, Paths.down_path, num)
     else:
-        await gDownloadFile(file_id, Paths.down_path)
+        await gDownloadFile(file_id, Paths.down_path, num)
 
 
 async def getIDFromURL(link: str):
@@ -52,72 +59,125 @@ async def getIDFromURL(link: str):
     return parse_qs(parsed.query)["id"][0]
 
 
-def getFilesByFolderID(folder_id):
-    page_token = None
-    files = []
-    while True:
-        response = (
-            Gdrive.service.files()  # type: ignore
-            .list(
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True,
-                q=f"'{folder_id}' in parents and trashed = false",
-                spaces="drive",
-                pageSize=200,
-                fields="nextPageToken, files(id, name, mimeType, size, shortcutDetails)",
-                orderBy="folder, name",
-                pageToken=page_token,
-            )
-            .execute()
-        )
-        files.extend(response.get("files", []))
-        page_token = response.get("nextPageToken")
-        if page_token is None:
-            break
-    return files
+FOLDER_MIME = "application/vnd.google-apps.folder"
+_LIST_FIELDS = "nextPageToken, files(id, name, mimeType, size, shortcutDetails, parents)"
+_PARENTS_PER_QUERY = 40  # keeps the combined 'in parents' query well under URL limits
+FILE_MARK_EVERY = 32 * 1024 * 1024  # checkpoint a whole-file download this often
 
 
-def getFileMetadata(file_id):
-    return (
-        Gdrive.service.files()  # type: ignore
-        .get(fileId=file_id, supportsAllDrives=True, fields="name, id, mimeType, size")
-        .execute()
-    )
+def threadService():
+    """Drive service private to the calling thread (httplib2 is not thread-safe)."""
+    service = getattr(_local, "service", None)
+    if service is None or getattr(_local, "creds", None) is not Gdrive.creds:
+        service = build("drive", "v3", credentials=Gdrive.creds, cache_discovery=False)
+        _local.service, _local.creds = service, Gdrive.creds
+    return service
 
 
-def get_Gfolder_size(folder_id):
-    try:
-        query = "trashed = false and '{0}' in parents".format(folder_id)
-        results = (
-            Gdrive.service.files()  # type: ignore
-            .list(
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True,
-                q=query,
-                fields="files(id, mimeType, size)",
+async def offLoop(func, *args):
+    """Run a blocking Drive lookup in the default executor."""
+    return await get_running_loop().run_in_executor(None, func, *args)
+
+
+def listChildren(folder_ids):
+    """
+    List the children of many folders with as few files.list calls as
+    possible: parents are or-combined per query and every page is followed.
+    Results are memoized in Gdrive.children / Gdrive.meta. Runs in a
+    worker thread; the lock keeps a walk of another job from reading a
+    folder whose listing is still being filled in.
+    """
+    with _list_lock:
+        _listChildren([f for f in folder_ids if f not in Gdrive.children])
+
+
+def _listChildren(folder_ids):
+    children = {folder_id: [] for folder_id in folder_ids}
+
+    for i in range(0, len(folder_ids), _PARENTS_PER_QUERY):
+        batch = folder_ids[i : i + _PARENTS_PER_QUERY]
+        parents = " or ".join(f"'{f}' in parents" for f in batch)
+        page_token = None
+        while True:
+            response = (
+                threadService().files()
+                .list(
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                    q=f"({parents}) and trashed = false",
+                    spaces="drive",
+                    pageSize=1000,
+                    fields=_LIST_FIELDS,
+                    pageToken=page_token,
+                )
+                .execute()
             )
-            .execute()
-        )
+            for item in response.get("files", []):
+                Gdrive.meta[item["id"]] = item
+                for parent in item.get("parents", []):
+                    if parent in children:
+                        children[parent].append(item)
+            page_token = response.get("nextPageToken")
+            if page_token is None:
+                break
+    # Published once complete, so a failed listing is retried next time
+    Gdrive.children.update(children)
 
-        total_size = 0
-        items = results.get("files", [])
 
-        folders_without_size = (
-            item["id"]
-            for item in items
-            if item.get("size") is None
-            and item["mimeType"] == "application/vnd.google-apps.folder"
-        )
+def walkTree(folder_id):
+    """Breadth-first listing of a whole folder tree, one level per round."""
+    frontier, seen = [folder_id], set()
+    while frontier:
+        seen.update(frontier)
+        listChildren(frontier)
+        next_level = []
+        for parent in frontier:
+            for item in Gdrive.children[parent]:
+                target_id, mime_type = resolveShortcut(item)
+                if mime_type == FOLDER_MIME and target_id not in seen:
+                    next_level.append(target_id)
+        frontier = next_level
+
+
+def resolveShortcut(item):
+    """Return (id, mimeType) of the item a shortcut points to, or of the item itself."""
+    shortcut_details = item.get("shortcutDetails")
+    if shortcut_details is not None:
+        return shortcut_details["targetId"], shortcut_details["targetMimeType"]
+    return item["id"], item.get("mimeType")
+
 
-        for item in items:
-            # If the item has a size attribute
-            if "size" in item:
-                total_size += int(item["size"])
+def getFilesByFolderID(folder_id):
+    listChildren([folder_id])
+    return Gdrive.children[folder_id]
+
+
+def getFileMetadata(file_id):
+    meta = Gdrive.meta.get(file_id)
+    if meta is None or "size" not in meta and meta.get("mimeType") != FOLDER_MIME:
+        meta = (
+            threadService().files()
+            .get(fileId=file_id, supportsAllDrives=True, fields="name, id, mimeType, size")
+            .execute()
+        )
+        Gdrive.meta[file_id] = meta
+    return meta
 
-        # Recursively call the function for folders whose size is not found
-        for folder_id in folders_without_size:
-            total_size += get_Gfolder_size(folder_id)
 
+def get_Gfolder_size(folder_id):
+    try:
+        walkTree(folder_id)
+        total_size, stack, seen = 0, [folder_id], set()
+        while stack:
+            parent = stack.pop()
+            seen.add(parent)
+            for item in Gdrive.children.get(parent, []):
+                target_id, mime_type = resolveShortcut(item)
+                if mime_type == FOLDER_MIME:
+                    if target_id not in seen:
+                        stack.append(target_id)
+                elif not mime_type.startswith("application/vnd.google-apps"):
+                    total_size += int(getFileMetadata(target_id).get("size", 0))
         return total_size
 
     except HttpError as error:
@@ -125,11 +185,173 @@ def get_Gfolder_size(folder_id):
         return -1
 
 
-async def gDownloadFile(file_id, path):
-    global TRANSFER_INFO
+def threadSession():
+    """Authorized requests session private to the calling thread."""
+    session = getattr(_local, "session", None)
+    if session is None or getattr(_local, "session_creds", None) is not Gdrive.creds:
+        session = AuthorizedSession(Gdrive.creds)
+        _local.session, _local.session_creds = session, Gdrive.creds
+    return session
+
+
+def mediaUrl(file_id) -> str:
+    return f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media&supportsAllDrives=true"
+
+
+def fetchFile(file_id, file_name, size: int, origin: str, progress: dict, stop: Event):
+    """
+    Blocking download of one Drive file straight into ``file_name``.
+    Bytes written so far are kept in ``progress[file_id]``; setting
+    ``stop`` aborts between chunks. A checkpointed partial file is resumed
+    from its last written byte. Meant to run in a worker thread.
+    """
+    key = f"gdrive:{file_id}"
+    offset = resumeOffset(Checkpoints.begin(key, origin, file_name, size))
+    progress[file_id] = offset
+    if size and offset >= size:
+        Checkpoints.finish(key)
+        return
+
+    # A resume asks for the rest of the file, like fetchRange does
+    url = mediaUrl(file_id)
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    resp = threadSession().get(url, headers=headers, stream=True, timeout=60)
+    resp.raise_for_status()
+    with resp, open(file_name, "r+b" if offset else "wb") as f:
+        f.seek(offset)
+        f.truncate()
+        marked = offset
+        for chunk in resp.iter_content(chunk_size=1024 * 1024):
+            while not DiskGuard.room.wait(Disk.poll):
+                if stop.is_set():
+                    return
+            if stop.is_set():
+                return
+            f.write(chunk)
+            offset += len(chunk)
+            progress[file_id] = offset
+            if offset - marked >= FILE_MARK_EVERY:
+                f.flush()
+                Checkpoints.mark(key, 0, offset - 1)
+                marked = offset
+    if size and offset != size:
+        raise IOError(f"{ospath.basename(file_name)} ended early at {offset} of {size}")
+    Checkpoints.finish(key)
+
+
+def fetchRange(file_id, fd: int, start: int, end: int, progress: dict, stop: Event):
+    """
+    Blocking download of bytes ``start``–``end`` (inclusive) of a Drive
+    file, written at their own offset of the already allocated ``fd``.
+    """
+    url = mediaUrl(file_id)
+    resp = threadSession().get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=60)
+    resp.raise_for_status()
+    offset = start
+    with resp:
+        for chunk in resp.iter_content(chunk_size=1024 * 1024):
+            if stop.is_set():
+                return
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+            progress[start] = offset - start
+    if offset != end + 1:
+        raise IOError(f"Range {start}-{end} ended early at {offset}")
+    Checkpoints.mark(f"gdrive:{file_id}", start, end)
+
+
+def _closeAfter(pool: ThreadPoolExecutor, fd: int):
+    """Close ``fd`` once every thread of ``pool`` writing to it has left."""
+    pool.shutdown(wait=True, cancel_futures=True)
+    os.close(fd)
+
+
+async def gDownloadRanges(file_id, file_name, size: int, num: int):
+    """Fetch one large file as Gdrive.range_workers concurrent byte ranges."""
+    key = f"gdrive:{file_id}"
+    done = Checkpoints.begin(key, sourceOf(num), file_name, size)
+    part = Gdrive.range_part
+    ranges = [(start, min(start + part, size) - 1) for start in range(0, size, part)]
+
+    progress = {}
+    todo = []
+    for start, end in ranges:
+        if isCovered(done, start, end):
+            progress[start] = end - start + 1
+        else:
+            todo.append((start, end))
+
+    flags = os.O_RDWR | os.O_CREAT | (0 if done else os.O_TRUNC)
+    fd = os.open(file_name, flags, 0o644)
+    stop = Event()
+    pool = ThreadPoolExecutor(max_workers=Gdrive.range_workers)
+    loop = get_running_loop()
+    try:
+        if not done:
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, size)
+
+        jobs = [
+            loop.run_in_executor(pool, fetchRange, file_id, fd, start, end, progress, stop)
+            for start, end in todo
+        ]
+        await gWaitJobs(jobs, progress, stop, num)
+    finally:
+        stop.set()
+        # shielded: the fd stays open until the last range thread is out,
+        # even when this task is cancelled meanwhile
+        await shield(loop.run_in_executor(None, _closeAfter, pool, fd))
+    Checkpoints.finish(key)
+
+
+async def gDownloadError(error: Exception):
+    if isinstance(error, HttpError):
+        if error.resp.status == 403 and "User Rate Limit Exceeded" in str(error):
+            logging.error("Download quota for the file has been exceeded.")
+            await cancelTask("Download quota for the file has been exceeded.")
+        else:
+            logging.error("HttpError While Downloading: {0}".format(error))
+            await cancelTask("HttpError While Downloading: {0}".format(error))
+    else:
+        logging.error("Error downloading: {0}".format(error))
+        await cancelTask("Error downloading: {0}".format(error))
+
+
+async def gWaitJobs(jobs: list, progress: dict, stop: Event, num: int):
+    """Poll running fetchFile jobs, feeding the status bar with their sum."""
+    try:
+        while not all(job.done() for job in jobs):
+            DiskGuard.check()  # fetchFile threads hold while the disk is full
+            file_d_size = sum(progress.values())
+            if num in Transfer.live:
+                Transfer.live[num] = file_d_size
+            down_done = sum(Transfer.down_bytes) + file_d_size
+            speed_string, eta, percentage = speedETA(
+                BotTimes.task_start, down_done, Transfer.total_down_size
+            )
+            await status_bar(
+                down_msg=Transfer.down_heads.get(num, Messages.status_head),
+                speed=speed_string,
+                percentage=percentage,
+                eta=getTime(eta),
+                done=sizeUnit(down_done),
+                left=sizeUnit(Transfer.total_down_size),
+                engine="G-Api ♻️",
+            )
+            await sleep(1)
+        for job in jobs:
+            job.result()
+    except BaseException:
+        stop.set()
+        raise
+
+
+async def gDownloadFile(file_id, path, num: int = 0):
     # Check if the specified file or folder exists and is downloadable.
     try:
-        file = getFileMetadata(file_id)
+        file = await offLoop(getFileMetadata, file_id)
     except HttpError as error:
         err = "Sorry, the specified file or folder does not exist or is not accessible."
         logging.info(err)
@@ -145,82 +367,79 @@ async def gDownloadFile(file_id, path):
             try:
                 file_name = file.get("name", f"untitleddrivefile_{file_id}")
                 file_name = ospath.join(path, file_name)
-                # Create a BytesIO stream to hold the downloaded file data.
-                file_contents = io.BytesIO()
-
-                # Download the file or folder contents to the BytesIO stream.
-                request = Gdrive.service.files().get_media(  # type: ignore
-                    fileId=file_id, supportsAllDrives=True
-                )
-
-                file_downloader = MediaIoBaseDownload(
-                    file_contents, request, chunksize=70 * 1024 * 1024
-                )
 
-                done = False
-                while done is False:
-                    status, done = file_downloader.next_chunk()
-                    # Get current value from file_contents.
-                    file_contents.seek(0)
-                    with open(file_name, "ab") as f:
-                        f.write(file_contents.getvalue())
-                    # Reset the buffer for the next chunk.
-                    file_contents.seek(0)
-                    file_contents.truncate()
-                    # The saved bytes until now
-                    file_d_size = int(status.progress() * int(file["size"]))
-                    down_done = sum(Transfer.down_bytes) + file_d_size
-                    speed_string, eta, percentage = speedETA(
-                        BotTimes.task_start, down_done, Transfer.total_down_size
-                    )
-                    await status_bar(
-                        down_msg=down_msg,
-                        speed=speed_string,
-                        percentage=percentage,
-                        eta=getTime(eta),
-                        done=sizeUnit(down_done),
-                        left=sizeUnit(Transfer.total_down_size),
-                        engine="G-Api ♻️",
-                    )
-                Transfer.down_bytes.append(int(file["size"]))
-
-            except HttpError as error:
-                if error.resp.status == 403 and "User Rate Limit Exceeded" in str(
-                    error
-                ):
-                    logging.error("Download quota for the file has been exceeded.")
-                    await cancelTask("Download quota for the file has been exceeded.")
-                    return
+                size = int(file["size"])
+                if size >= Gdrive.range_threshold:
+                    # Several throttled streams beat one for big files
+                    await gDownloadRanges(file_id, file_name, size, num)
                 else:
-                    logging.error("HttpError While Downloading: {0}".format(error))
-                    await cancelTask("HttpError While Downloading: {0}".format(error))
-                    return
+                    progress, stop = {}, Event()
+                    # Chunks are written straight into the target file; the
+                    # blocking HTTP calls run off the event loop.
+                    job = get_running_loop().run_in_executor(
+                        None, fetchFile, file_id, file_name, size, sourceOf(num), progress, stop
+                    )
+                    await gWaitJobs([job], progress, stop, num)
+                Transfer.down_bytes.append(size)
 
-            except Exception as e:
-                logging.error("Error downloading: {0}".format(e))
-                await cancelTask("Error downloading: {0}".format(e))
+            except Exception as error:
+                await gDownloadError(error)
                 return
 
 
-async def gDownloadFolder(folder_id, path):
-    folder_meta = getFileMetadata(folder_id)
-    folder_name = folder_meta["name"]
-    if not ospath.exists(f"{path}/{folder_name}"):
-        makedirs(f"{path}/{folder_name}")
-    path += f"/{folder_name}"
-    result = getFilesByFolderID(folder_id)
-    if len(result) == 0:
-        return
-    result = natsorted(result, key=lambda k: k["name"])
+def listFolderTree(folder_id, path):
+    """
+    Walk a Drive folder, creating the natsorted local layout under ``path``.
+    Returns (file_id, local_path, size) for every downloadable file.
+    """
+    folder_name = getFileMetadata(folder_id)["name"]
+    path = ospath.join(path, folder_name)
+    if not ospath.exists(path):
+        makedirs(path)
+    files = []
+    result = natsorted(getFilesByFolderID(folder_id), key=lambda k: k["name"])
     for item in result:
-        file_id = item["id"]
-        shortcut_details = item.get("shortcutDetails")
-        if shortcut_details is not None:
-            file_id = shortcut_details["targetId"]
-            mime_type = shortcut_details["targetMimeType"]
-        else:
-            mime_type = item.get("mimeType")
-        if mime_type == "application/vnd.google-apps.folder":
-            await gDownloadFolder(file_id, path)
+        file_id, mime_type = resolveShortcut(item)
+        if mime_type == FOLDER_MIME:
+            files += listFolderTree(file_id, path)
+        elif mime_type.startswith("application/vnd.google-apps"):
+            logging.warning(f"Skipping Google Docs file: {item['name']}")
         else:
-            await gDownloadFile(file_id, path)
+            size = int(getFileMetadata(file_id).get("size", 0))
+            files.append((file_id, ospath.join(path, item["name"]), size))
+    return files
+
+
+def folderFiles(folder_id, path):
+    """List a whole folder tree, then lay it out under ``path`` (blocking)."""
+    walkTree(folder_id)
+    return listFolderTree(folder_id, path)
+
+
+async def gDownloadFolder(folder_id, path, num: int = 0):
+    try:
+        # The whole walk makes blocking list calls: keep it off the loop
+        files = await offLoop(folderFiles, folder_id, path)
+    except HttpError as error:
+        await gDownloadError(error)
+        return
+    if len(files) == 0:
+        return
+
+    loop = get_running_loop()
+    progress, stop = {}, Event()
+    pool = ThreadPoolExecutor(max_workers=Gdrive.folder_workers)
+    jobs = [
+        loop.run_in_executor(
+            pool, fetchFile, file_id, file_name, size, sourceOf(num), progress, stop
+        )
+        for file_id, file_name, size in files
+    ]
+    try:
+        await gWaitJobs(jobs, progress, stop, num)
+    except Exception as error:
+        await gDownloadError(error)
+        return
+    finally:
+        pool.shutdown(wait=False)
+    Transfer.down_bytes.append(sum(size for _, _, size in files))
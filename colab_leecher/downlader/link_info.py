@@ -0,0 +1,105 @@
+"""
+colab_leecher/downlader/link_info.py
+Shared metadata resolver for direct HTTP links.
+
+One pooled aiohttp HEAD (or a ranged GET when HEAD is refused) tells us
+the file name, size, content type and whether the server honours Range
+requests. Results are cached per URL for _CACHE_TTL seconds so the name
+lookup, the size estimate and the download itself all share one probe.
+"""
+import time
+import logging
+from os import path as ospath
+from email.message import Message
+from urllib.parse import urlparse, unquote, parse_qs
+
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+_CACHE_TTL = 600
+_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+_cache: dict = {}  # url → (timestamp, info)
+_session: aiohttp.ClientSession = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            headers=_HEADERS,
+            connector=aiohttp.TCPConnector(limit=8),
+            timeout=aiohttp.ClientTimeout(total=20),
+        )
+    return _session
+
+
+def _name_from_headers(headers, url: str) -> str:
+    disposition = headers.get("Content-Disposition")
+    if disposition:
+        msg = Message()
+        msg["Content-Disposition"] = disposition
+        name = msg.get_filename()
+        if name:
+            return ospath.basename(name.strip().strip('"'))
+    return ospath.basename(unquote(urlparse(url).path))
+
+
+def _magnet_info(link: str) -> dict:
+    dn = parse_qs(urlparse(link).query).get("dn", [""])[0]
+    return {"name": dn, "size": 0, "type": "", "ranges": False}
+
+
+async def _probe(url: str) -> dict:
+    session = _get_session()
+    info = {"name": "", "size": 0, "type": "", "ranges": False}
+
+    try:
+        async with session.head(url, allow_redirects=True) as resp:
+            if resp.status < 400:
+                info["name"] = _name_from_headers(resp.headers, str(resp.url))
+                info["size"] = int(resp.headers.get("Content-Length") or 0)
+                info["type"] = resp.headers.get("Content-Type", "")
+                info["ranges"] = resp.headers.get("Accept-Ranges", "") == "bytes"
+                if info["size"]:
+                    return info
+    except Exception as e:
+        log.debug(f"[LinkInfo] HEAD {url}: {e}")
+
+    # Some hosts refuse HEAD or omit the length — ask for a single byte
+    try:
+        async with session.get(
+            url, allow_redirects=True, headers={"Range": "bytes=0-0"}
+        ) as resp:
+            if resp.status < 400:
+                info["name"] = _name_from_headers(resp.headers, str(resp.url))
+                info["type"] = resp.headers.get("Content-Type", "")
+                content_range = resp.headers.get("Content-Range", "")
+                if resp.status == 206 and "/" in content_range:
+                    info["ranges"] = True
+                    total = content_range.rsplit("/", 1)[1]
+                    info["size"] = int(total) if total.isdigit() else 0
+                else:
+                    info["size"] = int(resp.headers.get("Content-Length") or 0)
+    except Exception as e:
+        log.debug(f"[LinkInfo] GET {url}: {e}")
+
+    return info
+
+
+async def resolveLink(link: str) -> dict:
+    """Return {"name", "size", "type", "ranges"} for a link, cached by URL."""
+    hit = _cache.get(link)
+    if hit and time.time() - hit[0] < _CACHE_TTL:
+        return hit[1]
+
+    if link.startswith("magnet:"):
+        info = _magnet_info(link)
+    elif urlparse(link).scheme in ("http", "https"):
+        info = await _probe(link)
+    else:
+        info = {"name": ospath.basename(link), "size": 0, "type": "", "ranges": False}
+
+    _cache[link] = (time.time(), info)
+    return info
@@ -1,12 +1,13 @@
 import logging
 from natsort import natsorted
 from datetime import datetime
-from asyncio import sleep, get_running_loop
+from asyncio import sleep, gather, ensure_future, Semaphore
 from colab_leecher.downlader.mega import megadl
 from colab_leecher.utility.handler import cancelTask
+from colab_leecher.utility.disk import DiskBudget
 from colab_leecher.downlader.terabox import terabox_download
 from colab_leecher.downlader.ytdl import YTDL_Status, get_YT_Name
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from colab_leecher.downlader.link_info import resolveLink
 from colab_leecher.downlader.aria2 import aria2_Download, get_Aria2c_Name
 from colab_leecher.downlader.telegram import TelegramDownload, media_Identifier
 from colab_leecher.utility.variables import (
@@ -17,8 +18,13 @@ from colab_leecher.utility.variables import (
     Messages,
     Aria2c,
     BotTimes,
+    TaskInfo,
 )
 from colab_leecher.utility.helper import (
+    getTime,
+    sizeUnit,
+    speedETA,
+    status_bar,
     isYtdlComplete,
     keyboard,
     sysINFO,
@@ -27,6 +33,7 @@ from colab_leecher.utility.helper import (
     is_terabox,
     is_ytdl_link,
     is_telegram,
+    is_torrent,
 )
 from colab_leecher.downlader.gdrive import (
     build_service,
@@ -34,10 +41,40 @@ from colab_leecher.downlader.gdrive import (
     get_Gfolder_size,
     getFileMetadata,
     getIDFromURL,
+    offLoop,
 )
 
 
-async def downloadManager(source, is_ytdl: bool):
+# Max links in flight per engine when a batch is downloaded concurrently
+ENGINE_LIMITS = {
+    "http": 4,
+    "gdrive": 2,
+    "telegram": 3,
+    "terabox": 2,
+    "mega": 1,
+    "ytdl": 1,  # YTDL progress state is a single global
+}
+
+
+def linkEngine(link: str) -> str:
+    if is_google_drive(link):
+        return "gdrive"
+    elif is_telegram(link):
+        return "telegram"
+    elif is_ytdl_link(link):
+        return "ytdl"
+    elif is_mega(link):
+        return "mega"
+    elif is_terabox(link):
+        return "terabox"
+    return "http"
+
+
+async def downloadManager(source, is_ytdl: bool, on_done=None):
+    """
+    Download every link of the task. ``on_done()``, when given, is called
+    each time a link has finished so its files can be picked up early.
+    """
     message = "\n<b>Please Wait...</b> ⏳\n<i>Merging YTDL Video...</i> 🐬"
     BotTimes.task_start = datetime.now()
     if is_ytdl:
@@ -52,88 +89,172 @@ async def downloadManager(source, is_ytdl: bool):
             pass
         while not isYtdlComplete():
             await sleep(2)
+        if on_done is not None:
+            on_done()
+    elif len(source) == 1:
+        try:
+            await downloadLink(source[0], 1)
+        except Exception as Error:
+            await cancelTask(f"Download Error: {str(Error)}")
+            logging.error(f"Error While Downloading: {Error}")
+        else:
+            if on_done is not None:
+                on_done()
     else:
-        for i, link in enumerate(source):
+        await batchDownload(source, on_done)
+
+
+async def batchDownload(source, on_done=None):
+    """Download every link at once, bounded by ENGINE_LIMITS per engine."""
+    limits = {engine: Semaphore(n) for engine, n in ENGINE_LIMITS.items()}
+    sizes  = {i + 1: Transfer.link_sizes.get(link, 0) for i, link in enumerate(source)}
+    Transfer.live = {}
+    Transfer.finished_links = 0
+
+    async def worker(num, link):
+        async with limits[linkEngine(link)]:
+            await DiskBudget.linkGate(num, sizes)
+            Transfer.live[num] = 0
             try:
-                if is_google_drive(link):
-                    await g_DownLoad(link, i + 1)
-                elif is_telegram(link):
-                    await TelegramDownload(link, i + 1)
-                elif is_ytdl_link(link):
-                    await YTDL_Status(link, i + 1)
-                    try:
-                        await MSG.status_msg.edit_text(
-                            text=Messages.task_msg
-                            + Messages.status_head
-                            + message
-                            + sysINFO(),
-                            reply_markup=keyboard(),
-                        )
-                    except Exception:
-                        pass
-                    while not isYtdlComplete():
-                        await sleep(2)
-                elif is_mega(link):
-                    executor = ProcessPoolExecutor()
-                    # await loop.run_in_executor(executor, megadl, link, i + 1)
-                    await megadl(link, i + 1)
-                elif is_terabox(link):
-                    tera_dn = f"<b>PLEASE WAIT ⌛</b>\n\n__Generating Download Link For__\n\n<code>{link}</code>"
-                    try:
-                        await MSG.status_msg.edit_text(
-                            text=tera_dn + sysINFO(), reply_markup=keyboard()
-                        )
-                    except Exception as e1:
-                        print(f"Couldn't Update text ! Because: {e1}")
-
-                    await terabox_download(link, i + 1)
-                else:
-                    aria2_dn = f"<b>PLEASE WAIT ⌛</b>\n\n__Getting Download Info For__\n\n<code>{link}</code>"
-                    try:
-                        await MSG.status_msg.edit_text(
-                            text=aria2_dn + sysINFO(), reply_markup=keyboard()
-                        )
-                    except Exception as e1:
-                        print(f"Couldn't Update text ! Because: {e1}")
-                    Aria2c.link_info = False
-                    await aria2_Download(link, i + 1)
+                await downloadLink(link, num)
             except Exception as Error:
                 await cancelTask(f"Download Error: {str(Error)}")
                 logging.error(f"Error While Downloading: {Error}")
-                return
+                raise
+            finally:
+                Transfer.live.pop(num, None)
+                Transfer.finished_links += 1
+            if on_done is not None:
+                on_done()
+
+    Transfer.batch = True
+    reporter = ensure_future(batchStatus(len(source)))
+    try:
+        await gather(*(worker(i + 1, link) for i, link in enumerate(source)))
+    except Exception:
+        pass
+    finally:
+        Transfer.batch = False
+        reporter.cancel()
+
+
+async def batchStatus(total_links: int):
+    """Render one combined progress view while a batch downloads."""
+    started = datetime.now()
+    while True:
+        done = sum(Transfer.down_bytes) + sum(Transfer.live.values())
+        speed_string, eta, percentage = speedETA(
+            started, done, Transfer.total_down_size
+        )
+        head = (
+            f"<b>📥 DOWNLOADING » </b><i>{Transfer.finished_links} / {total_links} links</i>\n\n"
+            f"<b>⚡ Active » </b><code>{len(Transfer.live)}</code>"
+            + (f"  <i>(🔗 {', '.join(str(n).zfill(2) for n in sorted(Transfer.live))})</i>\n" if Transfer.live else "\n")
+        )
+        if Transfer.sent_file:
+            head += f"<b>📤 Uploaded » </b><code>{len(Transfer.sent_file)}</code>\n"
+        TaskInfo.set(
+            phase="download", engine="Batch",
+            done_bytes=done, total_bytes=Transfer.total_down_size,
+            percentage=percentage, speed=speed_string, eta=getTime(eta),
+        )
+        await status_bar(
+            head,
+            speed_string,
+            percentage,
+            getTime(eta),
+            sizeUnit(done),
+            sizeUnit(Transfer.total_down_size),
+            "Batch 🧵",
+            batch=True,
+        )
+        await sleep(1)
+
+
+async def downloadLink(link: str, num: int):
+    message = "\n<b>Please Wait...</b> ⏳\n<i>Merging YTDL Video...</i> 🐬"
+    if is_google_drive(link):
+        await g_DownLoad(link, num)
+    elif is_telegram(link):
+        await TelegramDownload(link, num)
+    elif is_ytdl_link(link):
+        await YTDL_Status(link, num)
+        try:
+            await MSG.status_msg.edit_text(
+                text=Messages.task_msg
+                + Messages.status_head
+                + message
+                + sysINFO(),
+                reply_markup=keyboard(),
+            )
+        except Exception:
+            pass
+        while not isYtdlComplete():
+            await sleep(2)
+    elif is_mega(link):
+        await megadl(link, num)
+    elif is_terabox(link):
+        tera_dn = f"<b>PLEASE WAIT ⌛</b>\n\n__Generating Download Link For__\n\n<code>{link}</code>"
+        if not Transfer.batch:
+            try:
+                await MSG.status_msg.edit_text(
+                    text=tera_dn + sysINFO(), reply_markup=keyboard()
+                )
+            except Exception as e1:
+                print(f"Couldn't Update text ! Because: {e1}")
+
+        await terabox_download(link, num)
+    else:
+        aria2_dn = f"<b>PLEASE WAIT ⌛</b>\n\n__Getting Download Info For__\n\n<code>{link}</code>"
+        if not Transfer.batch:
+            try:
+                await MSG.status_msg.edit_text(
+                    text=aria2_dn + sysINFO(), reply_markup=keyboard()
+                )
+            except Exception as e1:
+                print(f"Couldn't Update text ! Because: {e1}")
+        Aria2c.link_info = False
+        await aria2_Download(link, num)
 
 
 async def calDownSize(sources):
     global TRANSFER_INFO
     for link in natsorted(sources):
-        if is_google_drive(link):
-            await build_service()
-            id = await getIDFromURL(link)
-            try:
-                meta = getFileMetadata(id)
-            except Exception as e:
-                if "File not found" in str(e):
-                    err = "The file link you gave either doesn't exist or You don't have access to it!"
-                elif "Failed to retrieve" in str(e):
-                    err = "Authorization Error with Google ! Make Sure you generated token.pickle !"
-                else:
-                    err = f"Error in G-API: {e}"
-                logging.error(err)
-                await cancelTask(err)
+        before = Transfer.total_down_size
+        await linkSize(link)
+        Transfer.link_sizes[link] = Transfer.total_down_size - before
+
+
+async def linkSize(link: str):
+    """Add the size of ``link`` to Transfer.total_down_size (when it can be told)."""
+    if is_google_drive(link):
+        await build_service()
+        id = await getIDFromURL(link)
+        try:
+            meta = await offLoop(getFileMetadata, id)
+        except Exception as e:
+            if "File not found" in str(e):
+                err = "The file link you gave either doesn't exist or You don't have access to it!"
+            elif "Failed to retrieve" in str(e):
+                err = "Authorization Error with Google ! Make Sure you generated token.pickle !"
             else:
-                if meta.get("mimeType") == "application/vnd.google-apps.folder":
-                    Transfer.total_down_size += get_Gfolder_size(id)
-                else:
-                    Transfer.total_down_size += int(meta["size"])
-        elif is_telegram(link):
-            media, _ = await media_Identifier(link)
-            if media is not None:
-                size = media.file_size
-                Transfer.total_down_size += size
+                err = f"Error in G-API: {e}"
+            logging.error(err)
+            await cancelTask(err)
+        else:
+            if meta.get("mimeType") == "application/vnd.google-apps.folder":
+                Transfer.total_down_size += await offLoop(get_Gfolder_size, id)
             else:
-                logging.error("Couldn't Download Telegram Message")
+                Transfer.total_down_size += int(meta["size"])
+    elif is_telegram(link):
+        media, _ = await media_Identifier(link)
+        if media is not None:
+            size = media.file_size
+            Transfer.total_down_size += size
         else:
-            pass
+            logging.error("Couldn't Download Telegram Message")
+    elif linkEngine(link) == "http" and not is_torrent(link):
+        Transfer.total_down_size += (await resolveLink(link))["size"]
 
 
 async def get_d_name(link: str):
@@ -143,7 +264,7 @@ async def get_d_name(link: str):
         return
     if is_google_drive(link):
         id = await getIDFromURL(link)
-        meta = getFileMetadata(id)
+        meta = await offLoop(getFileMetadata, id)
         Messages.download_name = meta["name"]
     elif is_telegram(link):
         media, _ = await media_Identifier(link)
@@ -155,4 +276,4 @@ async def get_d_name(link: str):
             "Don't Know 🥲 (Trying)"  # TODO: Get download name via megadl
         )
     else:
-        Messages.download_name = get_Aria2c_Name(link)
+        Messages.download_name = await get_Aria2c_Name(link)
@@ -1,9 +1,15 @@
+import os
 import logging
 from datetime import datetime
 from os import path as ospath
+from asyncio import Queue, gather, ensure_future
+from pyrogram import raw
+from pyrogram.file_id import FileId, FileType
 from colab_leecher import colab_bot
+from colab_leecher.utility.mtproto import mediaSessions
 from colab_leecher.utility.handler import cancelTask
-from colab_leecher.utility.variables import Transfer, Paths, Messages, BotTimes
+from colab_leecher.utility.disk import DiskGuard
+from colab_leecher.utility.variables import Transfer, Paths, Messages, BotTimes, Telegram
 from colab_leecher.utility.helper import speedETA, getTime, sizeUnit, status_bar
 
 
@@ -35,8 +41,12 @@ async def media_Identifier(link):
     return media, message
 
 
-async def download_progress(current, total):
-    speed_string, eta, percentage = speedETA(start_time, current, total)
+async def download_progress(current, total, num: int = 0):
+    await DiskGuard.wait()  # both download paths await this, so they hold too
+    if num in Transfer.live:
+        Transfer.live[num] = current
+    started = Transfer.down_started.get(num, BotTimes.task_start)
+    speed_string, eta, percentage = speedETA(started, current, total)
 
     await status_bar(
         down_msg=Messages.status_head,
@@ -50,7 +60,6 @@ async def download_progress(current, total):
 
 
 async def TelegramDownload(link, num):
-    global start_time, TRANSFER_INFO
     media, message = await media_Identifier(link) # type: ignore
     if media is not None:
         name = media.file_name if hasattr(  # type: ignore
@@ -61,8 +70,91 @@ async def TelegramDownload(link, num):
         return
 
     Messages.status_head = f"<b>📥 DOWNLOADING FROM » </b><i>🔗Link {str(num).zfill(2)}</i>\n\n<code>{name}</code>\n"
-    start_time = datetime.now()
+    Transfer.down_started[num] = datetime.now()
     file_path = ospath.join(Paths.down_path, name)
-    
-    await message.download(progress=download_progress, in_memory=False, file_name=file_path) # type: ignore
+
+    if media.file_size >= Telegram.min_parallel_size:
+        try:
+            await parallelDownload(media, file_path, num)
+            Transfer.down_bytes.append(media.file_size)
+            return
+        except Exception as e:
+            logging.warning(f"Parallel download failed, falling back to Pyrogram: {e}")
+
+    await message.download(progress=download_progress, progress_args=(num,), in_memory=False, file_name=file_path) # type: ignore
     Transfer.down_bytes.append(media.file_size)
+
+
+def fileLocation(media):
+    file_id = FileId.decode(media.file_id)
+    if file_id.file_type == FileType.PHOTO:
+        location = raw.types.InputPhotoFileLocation(
+            id=file_id.media_id,
+            access_hash=file_id.access_hash,
+            file_reference=file_id.file_reference,
+            thumb_size=file_id.thumbnail_size,
+        )
+    else:
+        location = raw.types.InputDocumentFileLocation(
+            id=file_id.media_id,
+            access_hash=file_id.access_hash,
+            file_reference=file_id.file_reference,
+            thumb_size=file_id.thumbnail_size,
+        )
+    return file_id.dc_id, location
+
+
+async def parallelDownload(media, file_path: str, num: int):
+    """
+    Fetch a Telegram file as 1 MiB upload.GetFile parts, keeping
+    Telegram.parts_in_flight requests spread across Telegram.sessions
+    media sessions. Parts land at their offset of a preallocated
+    ``.temp`` file, which is renamed once every part is in.
+    """
+    dc_id, location = fileLocation(media)
+    sessions = await mediaSessions(dc_id, Telegram.sessions)
+    size = media.file_size
+    part = Telegram.part_size
+    parts = Queue()
+    for offset in range(0, size, part):
+        parts.put_nowait(offset)
+
+    temp_path = file_path + ".temp"
+    fd = os.open(temp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    done = [0]
+
+    async def worker(session):
+        while not parts.empty():
+            offset = parts.get_nowait()
+            r = await session.invoke(
+                raw.functions.upload.GetFile(location=location, offset=offset, limit=part),
+                sleep_threshold=30,
+            )
+            if not isinstance(r, raw.types.upload.File):
+                raise IOError(f"Unexpected GetFile reply: {type(r).__name__}")
+            os.pwrite(fd, r.bytes, offset)
+            done[0] += len(r.bytes)
+            await download_progress(done[0], size, num)
+
+    workers = []
+    try:
+        os.ftruncate(fd, size)
+        workers = [
+            ensure_future(worker(sessions[i % len(sessions)]))
+            for i in range(Telegram.parts_in_flight)
+        ]
+        await gather(*workers)
+    except BaseException:
+        # gather leaves the siblings of a failed worker running; they
+        # must be gone before their fd is closed
+        for w in workers:
+            w.cancel()
+        await gather(*workers, return_exceptions=True)
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    os.close(fd)
+    if done[0] != size:
+        os.remove(temp_path)
+        raise IOError(f"Got {done[0]} of {size} bytes")
+    os.replace(temp_path, file_path)
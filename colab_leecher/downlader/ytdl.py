@@ -2,6 +2,7 @@ import logging
 import yt_dlp
 from asyncio import sleep
 from threading import Thread
+from contextvars import copy_context
 from os import makedirs, path as ospath
 from colab_leecher.utility.handler import cancelTask
 from colab_leecher.utility.variables import YTDL, MSG, Messages, Paths
@@ -13,7 +14,8 @@ async def YTDL_Status(link, num):
     name = await get_YT_Name(link)
     Messages.status_head = f"<b>📥 DOWNLOADING FROM » </b><i>🔗Link {str(num).zfill(2)}</i>\n\n<code>{name}</code>\n"
 
-    YTDL_Thread = Thread(target=YouTubeDL, name="YouTubeDL", args=(link,))
+    # The thread reports into this task's YTDL state
+    YTDL_Thread = Thread(target=copy_context().run, name="YouTubeDL", args=(YouTubeDL, link))
     YTDL_Thread.start()
 
     while YTDL_Thread.is_alive():  # Until ytdl is downloading
@@ -287,10 +287,8 @@ async def nys_cb(client, cq):
     if action == "dl":
         if not magnet: return await client.send_message(uid, "❌ No magnet.")
         # Feed magnet into the bot's normal link handler
-        from colab_leecher.utility.variables import BOT
-        BOT.SOURCE = [magnet]
-        BOT.Mode.ytdl = False; BOT.Mode.mode = "leech"
-        BOT.State.started = True
+        from colab_leecher.utility.job_queue import Job, JobQueue
+        JobQueue.putDraft(cq.message.id, Job(sources=[magnet]))
         await cq.message.edit_text(
             f"📥 <b>Download queued</b>\n<code>{r.title[:50]}</code>\n\n"
             "Choose mode:",
@@ -748,8 +746,8 @@ async def nyt_cb(client, cq):
     if action == "m":
         await client.send_message(uid, f"🧲 <code>{magnet}</code>")
     elif action == "dl":
-        from colab_leecher.utility.variables import BOT
-        BOT.SOURCE = [magnet]; BOT.Mode.ytdl = False; BOT.State.started = True
+        from colab_leecher.utility.job_queue import Job, JobQueue
+        JobQueue.putDraft(cq.message.id, Job(sources=[magnet]))
         await cq.message.edit_text(
             cq.message.text + "\n\n📥 <b>Queued for download</b>",
             reply_markup=InlineKeyboardMarkup([[
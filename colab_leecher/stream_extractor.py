@@ -6,6 +6,7 @@ Analyse un URL/fichier et liste toutes les pistes :
   - ffprobe : TOUT le reste (liens directs, seedr, DDL, fichiers locaux)
   Les deux sont tentés, ffprobe gagne sur les liens directs.
 """
+import os
 import json
 import logging
 import subprocess
@@ -13,6 +14,8 @@ import yt_dlp
 from asyncio import get_event_loop
 from concurrent.futures import ThreadPoolExecutor
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from colab_leecher.utility.ffmpeg import FFmpegError, runFFmpeg
+from colab_leecher.utility.variables import Messages
 
 _sessions: dict = {}
 _pool = ThreadPoolExecutor(max_workers=2)
@@ -154,6 +157,7 @@ def _parse_ffprobe(info: dict, url: str) -> dict:
         "video":  videos,
         "audio":  audios,
         "subs":   subs,
+        "duration": duration,
         "source": "ffprobe",
     }
 
@@ -341,17 +345,20 @@ def _dl_ytdlp(url: str, fmt_id: str, out: str) -> str:
         return ydl.prepare_filename(info)
 
 
-def _dl_ffmpeg(url: str, stream_map: str, out_file: str) -> str:
-    """Extrait une piste précise avec ffmpeg (map 0:N)."""
-    cmd = [
-        "ffmpeg", "-y", "-i", url,
-        "-map", stream_map,
-        "-c", "copy",
-        out_file,
-    ]
-    result = subprocess.run(cmd, capture_output=True, timeout=3600)
-    if result.returncode != 0:
-        raise RuntimeError(result.stderr.decode()[-300:])
+async def _dl_ffmpeg(session, stream_map: str, out_file: str) -> str:
+    """Extrait une piste précise avec ffmpeg (map 0:N), progression en direct."""
+    Messages.status_head = (
+        f"🎞 <b>STREAM EXTRACTOR</b>\n\n<code>{os.path.basename(out_file)}</code>\n"
+    )
+    try:
+        await runFFmpeg(
+            ["-y", "-i", session["url"], "-map", stream_map, "-c", "copy", out_file],
+            duration=session.get("duration") or 0,
+            engine="FFmpeg 🎞",
+            label="ffmpeg stream",
+        )
+    except FFmpegError as e:
+        raise RuntimeError(str(e))
     return out_file
 
 
@@ -369,7 +376,7 @@ async def dl_video(session, idx: int, out: str) -> str:
         return await loop.run_in_executor(_pool, _dl_ytdlp, session["url"], v["id"], out)
     else:
         fname = f"{out}/video_stream_{idx}.{v['ext']}"
-        return await loop.run_in_executor(_pool, _dl_ffmpeg, session["url"], v["map"], fname)
+        return await _dl_ffmpeg(session, v["map"], fname)
 
 
 async def dl_audio(session, idx: int, out: str) -> str:
@@ -379,7 +386,7 @@ async def dl_audio(session, idx: int, out: str) -> str:
         return await loop.run_in_executor(_pool, _dl_ytdlp, session["url"], a["id"], out)
     else:
         fname = f"{out}/audio_stream_{idx}.{a['ext']}"
-        return await loop.run_in_executor(_pool, _dl_ffmpeg, session["url"], a["map"], fname)
+        return await _dl_ffmpeg(session, a["map"], fname)
 
 
 async def dl_sub(session, idx: int, out: str) -> str:
@@ -389,4 +396,4 @@ async def dl_sub(session, idx: int, out: str) -> str:
         return await loop.run_in_executor(_pool, _dl_sub_url, s["url"], out, s["lang"], s["ext"])
     else:
         fname = f"{out}/subtitle_{s['lang']}_{idx}.{s['ext']}"
-        return await loop.run_in_executor(_pool, _dl_ffmpeg, session["url"], s["map"], fname)
+        return await _dl_ffmpeg(session, s["map"], fname)
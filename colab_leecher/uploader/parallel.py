@@ -0,0 +1,149 @@
+"""
+colab_leecher/uploader/parallel.py
+Multi-connection upload engine for big files.
+
+Pyrogram's send_video/send_document pushes saveBigFilePart chunks with
+little parallelism over one session. Here the file is memory-mapped and
+its 512 KiB parts are handed out as memoryview slices (no per-part read
+copies) to Telegram.parts_in_flight workers spread over Telegram.sessions
+media sessions. The finished InputFileBig is then attached to a
+messages.SendMedia call, so uploading and sending are separate steps.
+"""
+import os
+import mmap
+import logging
+import mimetypes
+from asyncio import Queue, ensure_future, gather
+from os import path as ospath
+
+from pyrogram import raw, types
+
+from colab_leecher import colab_bot, OWNER
+from colab_leecher.utility.mtproto import mediaSessions
+from colab_leecher.utility.variables import Telegram
+
+log = logging.getLogger(__name__)
+
+PART_SIZE = 512 * 1024  # largest part saveBigFilePart accepts
+
+
+async def uploadParts(
+    file_path: str, progress=None, offset: int = 0, length: int = None, name: str = None,
+):
+    """
+    Upload ``length`` bytes of ``file_path`` starting at ``offset`` (the
+    whole file by default) and return the resulting InputFileBig, named
+    ``name`` or after the file. ``progress(current, total)`` is awaited
+    after every part.
+    """
+    size = os.path.getsize(file_path) - offset if length is None else length
+    total_parts = -(-size // PART_SIZE)
+    file_id = colab_bot.rnd_id()
+    sessions = await mediaSessions(await colab_bot.storage.dc_id(), Telegram.sessions)
+
+    parts = Queue()
+    for i in range(total_parts):
+        parts.put_nowait(i)
+    done = [0]
+
+    with open(file_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+
+        async def worker(session):
+            while not parts.empty():
+                i = parts.get_nowait()
+                start = offset + i * PART_SIZE
+                chunk = view[start : min(start + PART_SIZE, offset + size)]
+                try:
+                    await session.invoke(
+                        raw.functions.upload.SaveBigFilePart(
+                            file_id=file_id,
+                            file_part=i,
+                            file_total_parts=total_parts,
+                            bytes=chunk,
+                        ),
+                        sleep_threshold=30,
+                    )
+                    done[0] += len(chunk)
+                finally:
+                    chunk.release()
+                if progress is not None:
+                    await progress(done[0], size)
+
+        workers = []
+        try:
+            workers = [
+                ensure_future(worker(sessions[i % len(sessions)]))
+                for i in range(Telegram.parts_in_flight)
+            ]
+            await gather(*workers)
+        finally:
+            # a failed worker leaves its siblings holding part slices;
+            # they must be done before the view under them is released
+            for w in workers:
+                w.cancel()
+            await gather(*workers, return_exceptions=True)
+            try:
+                view.release()
+                mm.close()
+            except BufferError:
+                log.debug("[ParallelUpload] mmap still referenced, left to GC")
+
+    return raw.types.InputFileBig(
+        id=file_id, parts=total_parts, name=name or ospath.basename(file_path)
+    )
+
+
+async def sendUploaded(
+    input_file, kind: str, file_name: str, caption: str,
+    thumb=None, duration: int = 0, width: int = 0, height: int = 0,
+):
+    """
+    Send an already uploaded file to the owner as ``kind``
+    (video/audio/photo/document). ``thumb`` is a path or an uploaded InputFile.
+    """
+    if isinstance(thumb, str):
+        thumb = await colab_bot.save_file(thumb)
+    if kind == "photo":
+        media = raw.types.InputMediaUploadedPhoto(file=input_file)
+    else:
+        mime_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+        if kind == "video":
+            attributes.append(raw.types.DocumentAttributeVideo(
+                supports_streaming=True, duration=duration, w=width, h=height,
+            ))
+        elif kind == "audio":
+            attributes.append(raw.types.DocumentAttributeAudio(duration=duration))
+
+        media = raw.types.InputMediaUploadedDocument(
+            file=input_file,
+            mime_type=mime_type,
+            attributes=attributes,
+            thumb=thumb,
+            force_file=kind == "document" or None,
+        )
+    text = await colab_bot.parser.parse(caption)
+    r = await colab_bot.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await colab_bot.resolve_peer(OWNER),
+            media=media,
+            random_id=colab_bot.rnd_id(),
+            message=text["message"],
+            entities=text["entities"] or None,
+        )
+    )
+    for update in getattr(r, "updates", []):
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(
+                colab_bot,
+                update.message,
+                {u.id: u for u in r.users},
+                {c.id: c for c in r.chats},
+            )
+    # A short reply only carries the new message's id
+    if isinstance(r, raw.types.UpdateShortSentMessage):
+        return await colab_bot.get_messages(OWNER, r.id)
+    # Callers keep the message for replies and the final caption edit
+    raise IOError(f"SendMedia returned no message ({type(r).__name__})")
@@ -1,115 +1,138 @@
+import os
 import logging
-from PIL import Image
 from asyncio import sleep
+from functools import partial
 from os import path as ospath
 from datetime import datetime
 from pyrogram.errors import FloodWait
-from colab_leecher import colab_bot, OWNER
-from colab_leecher.utility.variables import BOT, Transfer, BotTimes, Messages, MSG, Paths
+from colab_leecher import colab_bot
+from colab_leecher.uploader.parallel import uploadParts, sendUploaded
+from colab_leecher.utility.variables import BOT, Transfer, Messages, MSG, Paths, Telegram
 from colab_leecher.utility.helper import (
-    sizeUnit, fileType, getTime, status_bar, thumbMaintainer, videoExtFix,
+    sizeUnit, fileType, getTime, status_bar,
 )
+from colab_leecher.utility.media_info import mediaInfo, thumbMaintainer
 
 
-async def progress_bar(current, total):
-    upload_speed = 4 * 1024 * 1024
-    elapsed = (datetime.now() - BotTimes.task_start).seconds
-    if current > 0 and elapsed > 0:
-        upload_speed = current / elapsed
-    eta        = (Transfer.total_down_size - current - sum(Transfer.up_bytes)) / max(upload_speed, 1)
-    percentage = (current + sum(Transfer.up_bytes)) / max(Transfer.total_down_size, 1) * 100
+async def progress_bar(current, total, slot: int = 0):
+    """Record ``slot``'s progress and render the total over every slot."""
+    Transfer.up_live[slot] = current
+    now  = datetime.now()
+    done = sum(Transfer.up_bytes) + sum(Transfer.up_live.values())
+    upload_speed = sum(
+        c / max((now - Transfer.up_started.get(s, now)).seconds, 1)
+        for s, c in Transfer.up_live.items()
+    ) or 4 * 1024 * 1024
+    eta        = (Transfer.total_down_size - done) / max(upload_speed, 1)
+    percentage = done / max(Transfer.total_down_size, 1) * 100
     await status_bar(
         down_msg=Messages.status_head,
         speed=f"{sizeUnit(upload_speed)}/s",
         percentage=percentage,
         eta=getTime(eta),
-        done=sizeUnit(current + sum(Transfer.up_bytes)),
+        done=sizeUnit(done),
         left=sizeUnit(Transfer.total_down_size),
         engine="Pyrofork 💥",
     )
 
 
-async def upload_file(file_path, real_name, is_last: bool = False):
+def uploadCaption(real_name: str, is_last: bool = False) -> str:
+    """Clean name, or "✅ Done · name" on the final file."""
+    name_part = f"{BOT.Setting.prefix} {real_name} {BOT.Setting.suffix}".strip()
+    if is_last:
+        return f"<{BOT.Options.caption}>✅ Done · {name_part}</{BOT.Options.caption}>"
+    return f"<{BOT.Options.caption}>{name_part}</{BOT.Options.caption}>"
+
+
+async def prepareFile(file_path: str, slot: int = 0, span: tuple = None) -> dict:
     """
-    Upload one file directly to the owner's private chat.
+    Push the bytes of ``file_path`` (and its thumbnail) to Telegram without
+    posting anything yet, so several files can upload at once. Returns what
+    sendPrepared() needs to post it.
 
-    is_last  — when True the caption shows ✅ Done and the
-               progress status message is deleted afterwards.
+    span  — (offset, length, name) to upload only that byte range of the
+            file as a document called ``name``.
     """
-    global Transfer, MSG
-    BotTimes.task_start = datetime.now()
+    Transfer.up_started[slot] = datetime.now()
+    Transfer.up_live[slot] = 0
 
-    # Caption: clean name, or "✅ Done · name" on the final file
-    name_part = f"{BOT.Setting.prefix} {real_name} {BOT.Setting.suffix}".strip()
-    if is_last:
-        caption = f"<{BOT.Options.caption}>✅ Done · {name_part}</{BOT.Options.caption}>"
+    type_ = fileType(file_path)
+    prep  = {
+        "name": ospath.basename(file_path),
+        "kind": type_ if BOT.Options.stream_upload else "document",
+        "thumb": None, "duration": 0, "width": 0, "height": 0,
+    }
+    if span is not None:
+        offset, length, prep["name"] = span
+        prep["kind"] = "document"
+        if ospath.exists(Paths.THMB_PATH):
+            prep["thumb"] = await colab_bot.save_file(Paths.THMB_PATH)
+        prep["file"] = await uploadParts(
+            file_path, partial(progress_bar, slot=slot), offset, length, prep["name"]
+        )
+        return prep
+
+    thmb_path = None
+    if prep["kind"] == "video":
+        thmb_path, seconds = await thumbMaintainer(file_path)
+        meta = await mediaInfo(file_path)
+        prep["width"], prep["height"] = meta["width"], meta["height"]
+        prep["duration"] = int(seconds)
+    elif prep["kind"] in ("audio", "document"):
+        if ospath.exists(Paths.THMB_PATH):
+            thmb_path = Paths.THMB_PATH
+        elif type_ == "video":
+            thmb_path, _ = await thumbMaintainer(file_path)
+    if thmb_path:
+        prep["thumb"] = await colab_bot.save_file(thmb_path)
+
+    # Big files go through the multi-connection engine
+    if os.path.getsize(file_path) >= Telegram.min_parallel_size:
+        prep["file"] = await uploadParts(file_path, partial(progress_bar, slot=slot))
     else:
-        caption = f"<{BOT.Options.caption}>{name_part}</{BOT.Options.caption}>"
+        prep["file"] = await colab_bot.save_file(
+            file_path, progress=progress_bar, progress_args=(slot,)
+        )
+    return prep
 
-    type_  = fileType(file_path)
-    f_type = type_ if BOT.Options.stream_upload else "document"
 
-    try:
-        if f_type == "video":
-            if not BOT.Options.stream_upload:
-                file_path = videoExtFix(file_path)
-            thmb_path, seconds = thumbMaintainer(file_path)
-            with Image.open(thmb_path) as img:
-                width, height = img.size
-            sent = await colab_bot.send_video(
-                chat_id=OWNER,
-                video=file_path,
-                supports_streaming=True,
-                width=width, height=height,
-                caption=caption,
-                thumb=thmb_path,
-                duration=int(seconds),
-                progress=progress_bar,
+async def sendPrepared(prep: dict, real_name: str, is_last: bool = False):
+    """Post a file uploaded by prepareFile() to the owner's private chat."""
+    global Transfer, MSG
+    while True:
+        try:
+            sent = await sendUploaded(
+                prep["file"], prep["kind"], prep["name"],
+                uploadCaption(real_name, is_last), thumb=prep["thumb"],
+                duration=prep["duration"], width=prep["width"], height=prep["height"],
             )
+            break
+        except FloodWait as e:
+            logging.warning(f"FloodWait {e.value}s")
+            await sleep(e.value)
 
-        elif f_type == "audio":
-            thmb_path = Paths.THMB_PATH if ospath.exists(Paths.THMB_PATH) else None
-            sent = await colab_bot.send_audio(
-                chat_id=OWNER,
-                audio=file_path,
-                caption=caption,
-                thumb=thmb_path,
-                progress=progress_bar,
-            )
+    MSG.sent_msg = sent
+    Transfer.sent_file.append(sent)
+    Transfer.sent_file_names.append(real_name)
 
-        elif f_type == "photo":
-            sent = await colab_bot.send_photo(
-                chat_id=OWNER,
-                photo=file_path,
-                caption=caption,
-                progress=progress_bar,
-            )
+    # Delete the progress status message once the last file lands
+    if is_last:
+        try:
+            await MSG.status_msg.delete()
+        except Exception:
+            pass
+    return sent
 
-        else:  # document
-            if ospath.exists(Paths.THMB_PATH):
-                thmb_path = Paths.THMB_PATH
-            elif type_ == "video":
-                thmb_path, _ = thumbMaintainer(file_path)
-            else:
-                thmb_path = None
-            sent = await colab_bot.send_document(
-                chat_id=OWNER,
-                document=file_path,
-                caption=caption,
-                thumb=thmb_path,
-                progress=progress_bar,
-            )
 
-        MSG.sent_msg = sent
-        Transfer.sent_file.append(sent)
-        Transfer.sent_file_names.append(real_name)
+async def upload_file(file_path, real_name, is_last: bool = False):
+    """
+    Upload one file directly to the owner's private chat.
 
-        # Delete the progress status message once the last file lands
-        if is_last:
-            try:
-                await MSG.status_msg.delete()
-            except Exception:
-                pass
+    is_last  — when True the caption shows ✅ Done and the
+               progress status message is deleted afterwards.
+    """
+    try:
+        await sendPrepared(await prepareFile(file_path), real_name, is_last)
 
     except FloodWait as e:
         logging.warning(f"FloodWait {e.value}s")
@@ -118,3 +141,6 @@ async def upload_file(file_path, real_name, is_last: bool = False):
 
     except Exception as e:
         logging.error(f"Upload error: {e}")
+
+    finally:
+        Transfer.up_live.pop(0, None)
@@ -0,0 +1,142 @@
+"""
+colab_leecher/utility/checkpoint.py
+On-disk checkpoint state for resumable downloads.
+
+Every partial download records which byte ranges of its target file are
+already on disk, keyed by source (a Drive file ID or a URL) and tagged
+with the link the task was started from. A task that is restarted with
+the same link keeps those partial files instead of wiping WORK_PATH and
+resumes from the recorded ranges. aria2 keeps its own authoritative
+state in the .aria2 control file next to the download; its checkpoint
+only pins the path so the control file survives.
+"""
+import os
+import json
+import shutil
+import logging
+from threading import Lock
+from os import path as ospath
+
+from colab_leecher.utility.variables import BOT, Paths, Task
+
+log = logging.getLogger(__name__)
+
+
+def _merge(ranges: list) -> list:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class Checkpoints:
+    _entries: dict = {}  # key → {"origin", "path", "size", "ranges"}
+    _lock = Lock()
+
+    @classmethod
+    def _load(cls):
+        try:
+            with open(Paths.checkpoints) as f:
+                cls._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"[Checkpoints] {e}")
+
+    @classmethod
+    def _save(cls):
+        os.makedirs(ospath.dirname(Paths.checkpoints), exist_ok=True)
+        tmp = Paths.checkpoints + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cls._entries, f)
+        os.replace(tmp, Paths.checkpoints)
+
+    @classmethod
+    def begin(cls, key: str, origin: str, path: str, size: int) -> list:
+        """
+        Start or resume tracking ``key``. Returns the ranges already on
+        disk — empty when the previous attempt doesn't match this one.
+        """
+        with cls._lock:
+            e = cls._entries.get(key)
+            if e and e["path"] == path and e["size"] == size and ospath.exists(path):
+                return [tuple(r) for r in e["ranges"]]
+            cls._entries[key] = {"origin": origin, "path": path, "size": size, "ranges": []}
+            cls._save()
+            return []
+
+    @classmethod
+    def mark(cls, key: str, start: int, end: int) -> None:
+        """Record bytes ``start``–``end`` (inclusive) of ``key`` as written."""
+        with cls._lock:
+            e = cls._entries.get(key)
+            if e is None:
+                return
+            e["ranges"] = _merge(e["ranges"] + [[start, end]])
+            cls._save()
+
+    @classmethod
+    def finish(cls, key: str) -> None:
+        with cls._lock:
+            if cls._entries.pop(key, None) is not None:
+                cls._save()
+
+    @classmethod
+    def paths(cls) -> set:
+        """Target paths of every download that is still in progress."""
+        with cls._lock:
+            return {e["path"] for e in cls._entries.values()}
+
+    @classmethod
+    def prune(cls, sources: list) -> set:
+        """Forget checkpoints of other links; return the paths worth keeping."""
+        with cls._lock:
+            for key in [k for k, e in cls._entries.items() if e["origin"] not in sources]:
+                del cls._entries[key]
+            cls._save()
+            return {e["path"] for e in cls._entries.values()}
+
+
+Checkpoints._load()
+
+
+def sourceOf(num: int) -> str:
+    """The task link that download number ``num`` was started from."""
+    return BOT.SOURCE[num - 1] if 0 < num <= len(BOT.SOURCE) else ""
+
+
+def isCovered(ranges: list, start: int, end: int) -> bool:
+    return any(s <= start and end <= e for s, e in ranges)
+
+
+def resumeOffset(ranges: list) -> int:
+    """Bytes that are contiguous from the start of the file."""
+    if ranges and ranges[0][0] == 0:
+        return ranges[0][1] + 1
+    return 0
+
+
+def clearWorkPath(sources: list):
+    """
+    Empty WORK_PATH like a fresh task would, but keep partial downloads
+    (and their aria2 control files) that belong to ``sources`` or to any
+    other running task.
+    """
+    keep = Checkpoints.prune(list(sources) + [s for t in Task.running() for s in t.sources])
+    keep |= {p + ".aria2" for p in keep}
+    if not ospath.exists(Paths.WORK_PATH):
+        return
+    if not keep:
+        shutil.rmtree(Paths.WORK_PATH)
+        return
+
+    for dirpath, dirnames, filenames in os.walk(Paths.WORK_PATH, topdown=False):
+        for name in filenames:
+            fp = ospath.join(dirpath, name)
+            if fp not in keep and not any(fp.startswith(k + "/") for k in keep):
+                os.remove(fp)
+        if dirpath != Paths.WORK_PATH and not os.listdir(dirpath):
+            os.rmdir(dirpath)
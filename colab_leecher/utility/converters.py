@@ -1,115 +1,231 @@
 import os
-import json
-import GPUtil
 import shutil
 import logging
 import subprocess
-from asyncio import sleep
-from threading import Thread
+from asyncio import (
+    sleep, gather, ensure_future, get_running_loop, create_subprocess_exec, Semaphore,
+)
+from asyncio.subprocess import PIPE, DEVNULL
+from natsort import natsorted
 from datetime import datetime
 from os import makedirs, path as ospath
-from moviepy.editor import VideoFileClip as VideoClip
-from colab_leecher.utility.variables import BOT, MSG, BotTimes, Paths, Messages
+from colab_leecher.utility.ffmpeg import (
+    FFmpegError, mediaDuration, probeMedia, reportProgress, runFFmpeg,
+)
+from colab_leecher.utility.hwaccel import HWAccel
+from colab_leecher.utility.variables import BOT, BotTimes, Paths, Messages, ProcessTracker
 from colab_leecher.utility.helper import (
     getSize,
     fileType,
-    keyboard,
     multipartArchive,
     sizeUnit,
     speedETA,
     status_bar,
-    sysINFO,
     getTime,
 )
 
 
-async def videoConverter(file: str):
-    global BOT, MSG, BotTimes
-
-    def convert_to_mp4(input_file, out_file):
-        clip = VideoClip(input_file)
-        clip.write_videofile(
-            out_file,
-            codec="libx264",
-            audio_codec="aac",
-            ffmpeg_params=["-strict", "-2"],
+CHUNK_MIN_DURATION = 600  # shorter videos aren't worth cutting up for encoding
+CHUNK_MIN_LENGTH = 30     # seconds per chunk at least
+
+# Codecs each output container takes as-is, so they can be stream-copied
+COPY_CODECS = {
+    "mp4": {
+        "video": {"h264", "hevc"},
+        "audio": {"aac", "mp3"},
+    },
+    "mkv": {
+        "video": {"h264", "hevc", "vp9", "av1"},
+        "audio": {"aac", "mp3", "opus", "vorbis", "ac3", "eac3", "flac"},
+    },
+}
+
+
+def _audioArgs(info: dict, container: str) -> list:
+    """Copy the audio when the container takes it, AAC otherwise."""
+    allowed = COPY_CODECS.get(container, COPY_CODECS["mp4"])["audio"]
+    audio = [s.get("codec_name") for s in info.get("streams", []) if s.get("codec_type") == "audio"]
+    if all(a in allowed for a in audio):
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+
+def _containerArgs(container: str) -> list:
+    if container == "mkv":
+        return ["-c:s", "copy"]
+    return ["-movflags", "+faststart"]
+
+
+def planConversion(info: dict, container: str, video_args: list) -> list:
+    """
+    Cheapest-first list of (label, ffmpeg output args) that turn the probed
+    input into ``container``: a plain remux when every stream can be
+    copied, an audio-only transcode when just the audio can't, then a full
+    video transcode (with ``video_args``) as the last resort.
+    """
+    allowed = COPY_CODECS.get(container, COPY_CODECS["mp4"])
+    video = [s.get("codec_name") for s in info.get("streams", []) if s.get("codec_type") == "video"
+             and not s.get("disposition", {}).get("attached_pic")]
+
+    maps = ["-map", "0:v:0", "-map", "0:a?"]
+    if container == "mkv":
+        maps += ["-map", "0:s?"]
+    maps += _containerArgs(container)
+    audio_args = _audioArgs(info, container)
+    tag = ["-tag:v", "hvc1"] if container == "mp4" and video[:1] == ["hevc"] else []
+
+    plans = []
+    if video and video[0] in allowed["video"]:
+        label = "Remux" if audio_args == ["-c:a", "copy"] else "Audio only"
+        plans.append((label, maps + ["-c:v", "copy", *tag, *audio_args]))
+    plans.append(("Transcode", maps + [*video_args, *audio_args]))
+    return plans
+
+
+async def chunkedTranscode(file: str, out_file: str, info: dict, container: str, video_args: list):
+    """
+    libx264 transcode spread over every core: the video stream is cut at
+    keyframes into chunks, the chunks are encoded by os.cpu_count()
+    single-threaded ffmpeg jobs at once, and the results are joined with
+    the concat demuxer while the audio is taken from the original.
+    """
+    duration = mediaDuration(info)
+    jobs = os.cpu_count() or 1
+    work = ospath.join(Paths.WORK_PATH, f"chunks_{ospath.basename(file)}")
+    shutil.rmtree(work, ignore_errors=True)
+    makedirs(work)
+    try:
+        seg_time = max(duration / (jobs * 2), CHUNK_MIN_LENGTH)
+        await runFFmpeg(
+            ["-y", "-i", file, "-map", "0:v:0", "-an", "-sn", "-c", "copy",
+             "-f", "segment", "-segment_time", f"{seg_time:.3f}",
+             "-reset_timestamps", "1", f"{work}/src%04d.mkv"],
+            duration=duration, engine="FFmpeg 🏍 · Chunking", label="ffmpeg chunk",
         )
-
-    async def msg_updater(c: int, tr, engine: str):
-        global Messages
-        messg = f"╭「" + "░" * c + "█" + "░" * (11 - c) + "」"
-        messg += f"\n├⏳ **Status »** __Running 🏃🏼‍♂️__\n├🕹 **Attempt »** __{tr}__"
-        messg += f"\n├⚙️ **Engine »** __{engine}__\n├💪🏼 **Handler »** __{core}__"
-        messg += f"\n╰🍃 **Time Spent »** __{getTime((datetime.now() - BotTimes.start_time).seconds)}__"
+        sources = natsorted(f for f in os.listdir(work) if f.startswith("src"))
+        outputs = [f"{work}/enc{str(i).zfill(4)}.mkv" for i in range(len(sources))]
+
+        limit = Semaphore(jobs)
+        done_s = [0.0] * len(sources)
+        started = datetime.now()
+
+        async def encode(i: int, src: str):
+            async def progress(seconds, size, speed):
+                done_s[i] = seconds
+                await reportProgress(
+                    sum(done_s), duration, 0, 0, f"FFmpeg 🏍 · {jobs} cores", started
+                )
+
+            async with limit:
+                await runFFmpeg(
+                    ["-y", "-i", ospath.join(work, src), *video_args,
+                     "-threads", "1", outputs[i]],
+                    label="ffmpeg chunk", on_progress=progress,
+                )
+            os.remove(ospath.join(work, src))
+
+        tasks = [ensure_future(encode(i, src)) for i, src in enumerate(sources)]
         try:
-            await MSG.status_msg.edit_text(
-                text=Messages.task_msg + mtext + messg + sysINFO(),
-                reply_markup=keyboard(),
-            )
-        except Exception:
-            pass
+            await gather(*tasks)
+        except BaseException:
+            # their ffmpeg must be gone before the work folder is removed
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
+            raise
+
+        listing = ospath.join(work, "chunks.txt")
+        with open(listing, "w") as f:
+            for out in outputs:
+                f.write("file '{}'\n".format(out.replace("'", "'\\''")))
+
+        maps = ["-map", "0:v", "-map", "1:a?"]
+        if container == "mkv":
+            maps += ["-map", "1:s?"]
+        await runFFmpeg(
+            ["-y", "-f", "concat", "-safe", "0", "-i", listing, "-i", file, *maps,
+             "-c:v", "copy", *_audioArgs(info, container), *_containerArgs(container),
+             out_file],
+            duration=duration, engine="FFmpeg 🏍 · Joining", label="ffmpeg concat",
+        )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+async def videoConverter(file: str):
+    global BOT, BotTimes
 
     name, ext = ospath.splitext(file)
 
     if ext.lower() in [".mkv", ".mp4"]:
         return file  # Return if It's already mp4 / mkv file
 
-    c, out_file, Err = 0, f"{name}.{BOT.Options.video_out}", False
-    gpu = len(GPUtil.getAvailable())
+    out_file = f"{name}.{BOT.Options.video_out}"
+    encoder = HWAccel.encoder(BOT.Options.convert_quality)
 
-    quality = "-preset slow -qp 0" if BOT.Options.convert_quality else ""
+    Messages.status_head = f"<b>🎥 CONVERTING » </b>\n\n<code>{ospath.basename(file)}</code>\n"
 
-    # ignored = "-hwaccel cuvid -c:v h264_cuvid"
-    if gpu == 1:
-        cmd = f"ffmpeg -y -i '{file}' {quality} -c:v h264_nvenc -c:a copy '{out_file}'"
-        core = "GPU"
+    info = await probeMedia(file)
+    for label, args in planConversion(info, BOT.Options.video_out, encoder.output_args):
+        transcode = label == "Transcode"
+        engine = f"FFmpeg 🏍 · {label}" + (f" · {encoder.core}" if transcode else "")
+        chunked = transcode and encoder.name == "libx264" \
+            and (os.cpu_count() or 1) > 1 and mediaDuration(info) >= CHUNK_MIN_DURATION
+        try:
+            if chunked:
+                try:
+                    await chunkedTranscode(
+                        file, out_file, info, BOT.Options.video_out, encoder.output_args
+                    )
+                except FFmpegError as e:
+                    logging.warning(f"Chunked transcode failed, encoding in one go: {e}")
+                    chunked = False
+            if not chunked:
+                await runFFmpeg(
+                    ["-y", *(encoder.input_args if transcode else []), "-i", file, *args, out_file],
+                    duration=mediaDuration(info),
+                    engine=engine,
+                    label="ffmpeg convert",
+                )
+            if ospath.exists(out_file) and getSize(out_file) > 0:
+                break
+        except FFmpegError as e:
+            logging.warning(f"{label} of {ospath.basename(file)} failed: {e}")
+        if ospath.exists(out_file):
+            os.remove(out_file)  # don't mistake a partial output for success
     else:
-        cmd = f"ffmpeg -y -i '{file}' {quality} -c:v libx264 -c:a copy '{out_file}'"
-        core = "CPU"
+        logging.error("This Video Can't Be Converted !")
+        return file
 
-    mtext = f"<b>🎥 Converting Video »</b>\n\n{ospath.basename(file)}\n\n"
+    os.remove(file)
+    return out_file
 
-    proc = subprocess.Popen(cmd, shell=True)
 
-    while proc.poll() is None:
-        await msg_updater(c, "1st", "FFmpeg 🏍")
-        c = (c + 1) % 12
-        await sleep(3)
-
-    if ospath.exists(out_file) and getSize(out_file) == 0:
-        os.remove(out_file)
-        Err = True
-    elif not ospath.exists(out_file):
-        Err = True
-
-    if Err:
-        proc = Thread(target=convert_to_mp4, name="Moviepy", args=(file, out_file))
-        proc.start()
-        core = "CPU"
-        while proc.is_alive():  # Until ytdl is downloading
-            await msg_updater(c, "2nd", "Moviepy 🛵")
-            c = (c + 1) % 12
-            await sleep(3)
-
-    if ospath.exists(out_file) and getSize(out_file) == 0:
-        os.remove(out_file)
-        Err = True
-    elif not ospath.exists(out_file):
-        Err = True
-    else:
-        Err = False
+MAX_SIZE = 2097152000  # 2 GB, Telegram's upload limit
+
+
+def virtualSplit(file_path: str) -> bool:
+    """
+    Whether an oversized file can go up as raw byte ranges of the original
+    (name.001, name.002, …) instead of parts written to temp_zpath. Videos
+    that get cut by ffmpeg and password-protected zips still need files.
+    """
+    if not BOT.Options.virtual_split or len(BOT.Options.zip_pswd) != 0:
+        return False
+    return not (fileType(file_path) == "video" and BOT.Options.is_split)
 
-    if Err:
-        logging.error("This Video Can't Be Converted !")
-        return file
-    else:
-        os.remove(file)
-        return out_file
+
+def byteRanges(file_path: str, max_size: int = MAX_SIZE) -> list:
+    """(offset, length) of equally sized parts no bigger than ``max_size``."""
+    size = ospath.getsize(file_path)
+    count = -(-size // max_size)
+    part = -(-size // count)
+    return [(offset, min(part, size - offset)) for offset in range(0, size, part)]
 
 
 async def sizeChecker(file_path, remove: bool):
     global Paths
-    max_size = 2097152000  # 2 GB
+    max_size = MAX_SIZE
     file_size = os.stat(file_path).st_size
 
     if file_size > max_size:
@@ -252,8 +368,47 @@ async def extract(zip_filepath, remove: bool):
     Messages.download_name = real_name
 
 
+SPLIT_BUFFER = 4 * 1024 * 1024   # read/write fallback chunk
+SPLIT_STEP = 128 * 1024 * 1024   # bytes copied between progress updates
+
+
+def _copyInto(src: int, dst: int, offset: int, count: int) -> int:
+    """
+    Append ``count`` bytes of ``src`` starting at ``offset`` to ``dst``.
+    copy_file_range / sendfile keep the data in the kernel; the plain
+    pread/write fallback only ever holds SPLIT_BUFFER bytes.
+    """
+    def kernel_copy(n, pos):
+        return os.copy_file_range(src, dst, n, pos)
+
+    def send_file(n, pos):
+        return os.sendfile(dst, src, pos, n)
+
+    def buffered(n, pos):
+        return os.write(dst, os.pread(src, min(n, SPLIT_BUFFER), pos))
+
+    methods = [m for m, ok in (
+        (kernel_copy, hasattr(os, "copy_file_range")),
+        (send_file, hasattr(os, "sendfile")),
+        (buffered, True),
+    ) if ok]
+    done = 0
+    while done < count:
+        try:
+            copied = methods[0](count - done, offset + done)
+        except OSError:
+            if len(methods) == 1:
+                raise
+            methods.pop(0)  # not supported here (e.g. across filesystems)
+            continue
+        if copied == 0:
+            break
+        done += copied
+    return done
+
+
 async def splitArchive(file_path, max_size):
-    global Paths, BOT, MSG, Messages
+    global Paths, BOT, Messages
     _, filename = ospath.split(file_path)
     new_path = f"{Paths.temp_zpath}/{filename}"
     Messages.status_head = f"<b>✂️ SPLITTING » </b>\n\n<code>{filename}</code>\n"
@@ -261,85 +416,158 @@ async def splitArchive(file_path, max_size):
     total_size = ospath.getsize(file_path)
 
     BotTimes.task_start = datetime.now()
+    loop = get_running_loop()
 
-    with open(file_path, "rb") as f:
-        chunk = f.read(max_size)
-        i = 1
+    src = os.open(file_path, os.O_RDONLY)
+    try:
         bytes_written = 0
-        while chunk:
-            # Generate filename for this chunk
-            ext = str(i).zfill(3)
-            output_filename = "{}.{}".format(new_path, ext)
-
-            # Write chunk to file
-            with open(output_filename, "wb") as out:
-                out.write(chunk)
-
-            bytes_written += len(chunk)
-            speed_string, eta, percentage = speedETA(
-                BotTimes.task_start, bytes_written, total_size
-            )
-            await status_bar(
-                Messages.status_head,
-                speed_string,
-                percentage,
-                getTime(eta),
-                sizeUnit(bytes_written),
-                sizeUnit(total_size),
-                "Xr-Split ✂️",
-            )
-            # Get next chunk
-            chunk = f.read(max_size)
-            i += 1  # Increment chunk counter
+        i = 1
+        while bytes_written < total_size:
+            # Generate filename for this part
+            output_filename = "{}.{}".format(new_path, str(i).zfill(3))
+            part_end = min(bytes_written + max_size, total_size)
+
+            dst = os.open(output_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while bytes_written < part_end:
+                    step = min(SPLIT_STEP, part_end - bytes_written)
+                    copied = await loop.run_in_executor(
+                        None, _copyInto, src, dst, bytes_written, step
+                    )
+                    if copied == 0:
+                        raise OSError(f"Unexpected end of {file_path}")
+                    bytes_written += copied
+
+                    speed_string, eta, percentage = speedETA(
+                        BotTimes.task_start, bytes_written, total_size
+                    )
+                    await status_bar(
+                        Messages.status_head,
+                        speed_string,
+                        percentage,
+                        getTime(eta),
+                        sizeUnit(bytes_written),
+                        sizeUnit(total_size),
+                        "Xr-Split ✂️",
+                    )
+            finally:
+                os.close(dst)
+            i += 1  # Increment part counter
+    finally:
+        os.close(src)
+
+
+SPLIT_MARGIN = 0.97  # headroom for container overhead in each part
+
+
+def _parsePackets(text: str) -> list:
+    """(time, size, is_video_keyframe) of every packet, in presentation order."""
+    packets = []
+    for line in text.splitlines():
+        f = dict(kv.split("=", 1) for kv in line.split("|") if "=" in kv)
+        t = f.get("pts_time", "N/A")
+        if t == "N/A":
+            t = f.get("dts_time", "N/A")
+        if t == "N/A" or not f.get("size", "").isdigit():
+            continue
+        key = f.get("codec_type") == "video" and "K" in f.get("flags", "")
+        packets.append((float(t), int(f["size"]), key))
+    packets.sort()
+    return packets
+
+
+def planCuts(packets: list, budget: int) -> list:
+    """
+    Keyframe times to cut at so no part holds more than ``budget`` bytes.
+    Each part ends at the last keyframe before its budget runs out.
+    """
+    cuts = [packets[0][0]]
+    acc, key_t, key_acc = 0, None, 0
+    for t, size, key in packets:
+        if key and t > cuts[-1]:
+            key_t, key_acc = t, acc
+        acc += size
+        if acc > budget and key_t is not None:
+            cuts.append(key_t)
+            acc -= key_acc
+            key_t = None
+    return cuts
+
+
+async def probePackets(file_path: str) -> list:
+    """Read the whole packet index of ``file_path`` with a single ffprobe pass."""
+    proc = await create_subprocess_exec(
+        "ffprobe", "-v", "error", "-show_entries",
+        "packet=codec_type,pts_time,dts_time,size,flags",
+        "-of", "compact=p=0", file_path,
+        stdout=PIPE, stderr=DEVNULL,
+    )
+    ProcessTracker.register(proc.pid, "ffprobe")
+    try:
+        out, _ = await proc.communicate()
+    finally:
+        ProcessTracker.unregister(proc.pid)
+    return await get_running_loop().run_in_executor(
+        None, _parsePackets, out.decode(errors="ignore")
+    )
 
 
 async def splitVideo(file_path, max_size, remove: bool):
-    global Paths, BOT, MSG, Messages
+    global Paths, BOT, Messages
     _, filename = ospath.split(file_path)
     just_name, extension = ospath.splitext(filename)
 
-    # FFmpeg command to get video information in JSON format
-    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", file_path]
-
-    bitrate = None
-    try:
-        # Run the command and get output
-        output = subprocess.check_output(cmd)
-        video_info = json.loads(output)
-        # Get bitrate in bits per second
-        bitrate = float(video_info["format"]["bit_rate"])
-    except subprocess.CalledProcessError:
-        logging.error("Error: Could not get video bitrate")
-        bitrate = 1000
-
-    # Convert target size from MB to bits
-    target_size_bits = max_size * 8 * 1024 * 1024
+    Messages.status_head = f"<b>✂️ SPLITTING » </b>\n\n<code>{filename}</code>\n"
+    BotTimes.task_start = datetime.now()
 
-    # Calculate duration in seconds
-    duration = int(target_size_bits / bitrate)
+    packets = await probePackets(file_path)
+    if not packets:
+        logging.error(f"Couldn't read the packet index of {filename}, splitting bytes instead")
+        await splitArchive(file_path, max_size * 1024 * 1024)
+        if remove:
+            os.remove(file_path)
+        return
+
+    cuts = planCuts(packets, int(max_size * 1024 * 1024 * SPLIT_MARGIN))
+    origin = cuts[0]
+    segments = [
+        (cuts[i] - origin, cuts[i + 1] - cuts[i] if i + 1 < len(cuts) else None)
+        for i in range(len(cuts))
+    ]
+    outputs = [
+        f"{Paths.temp_zpath}/{just_name}.part{str(i).zfill(3)}{extension}"
+        for i in range(len(segments))
+    ]
+
+    # Stream copies are I/O bound, a few at once is plenty
+    limit = Semaphore(min(4, os.cpu_count() or 1))
+    done_s = [0.0] * len(segments)
+    written = [0] * len(segments)
+    total_s = packets[-1][0] - origin
+
+    async def cut(i, start, length, out):
+        args = ["-y", "-ss", f"{start:.6f}", "-i", file_path]
+        if length is not None:
+            args += ["-t", f"{length:.6f}"]
+        args += ["-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero", out]
+
+        async def progress(seconds, size, speed):
+            done_s[i], written[i] = seconds, size
+            await reportProgress(
+                sum(done_s), total_s, sum(written), 0, "Xr-Split ✂️", BotTimes.task_start
+            )
 
-    cmd = f'ffmpeg -i {file_path} -c copy -f segment -segment_time {duration} -reset_timestamps 1 "{Paths.temp_zpath}/{just_name}.part%03d{extension}"'
+        async with limit:
+            await runFFmpeg(args, label="ffmpeg split", on_progress=progress)
 
-    Messages.status_head = f"<b>✂️ SPLITTING » </b>\n\n<code>{filename}</code>\n"
-    BotTimes.task_start = datetime.now()
+    await gather(*(
+        cut(i, start, length, out)
+        for i, ((start, length), out) in enumerate(zip(segments, outputs))
+    ))
 
-    proc = subprocess.Popen(cmd, shell=True)
-    total_size = getSize(file_path)
-    total_in_unit = sizeUnit(total_size)
-    while proc.poll() is None:
-        speed_string, eta, percentage = speedETA(
-            BotTimes.task_start, getSize(Paths.temp_zpath), total_size
-        )
-        await status_bar(
-            Messages.status_head,
-            speed_string,
-            percentage,
-            getTime(eta),
-            sizeUnit(getSize(Paths.temp_zpath)),
-            total_in_unit,
-            "Xr-Split ✂️",
-        )
-        await sleep(1)
+    for out in outputs:
+        if getSize(out) > max_size * 1024 * 1024:
+            logging.warning(f"{ospath.basename(out)} is still over the upload limit")
 
     if remove:
         os.remove(file_path)
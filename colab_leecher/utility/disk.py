@@ -0,0 +1,148 @@
+"""
+colab_leecher/utility/disk.py
+Disk budget and low-space guard for running tasks.
+
+A task's peak footprint is its calDownSize estimate times the factor of
+its mode (Disk.factors). It only starts downloading once that fits in
+the free space other running tasks have not claimed yet. A pipelined
+multi-link task uploads and deletes files while the rest download, so it
+claims only its biggest link and then starts each link only while that
+link fits. When free space drops below Disk.low_space while something is
+uploading, downloads pause until the uploads have freed enough room.
+"""
+import os
+import shutil
+import logging
+from asyncio import sleep
+from threading import Event
+from os import path as ospath
+
+from colab_leecher.utility.variables import BOT, MSG, Disk, Paths, Task, Transfer
+from colab_leecher.utility.helper import sizeUnit
+
+log = logging.getLogger(__name__)
+
+
+def freeSpace() -> int:
+    path = Paths.BASE_DIR
+    while not ospath.exists(path):
+        path = ospath.dirname(path)
+    return shutil.disk_usage(path).free
+
+
+def footprint(size: int) -> int:
+    """Peak disk use of ``size`` downloaded bytes in the current task's mode."""
+    return int(size * Disk.factors.get(BOT.Mode.type, 1.0))
+
+
+def _used(folder: str) -> int:
+    """Bytes under ``folder``; files may vanish while it's walked."""
+    total = 0
+    for dp, _, fns in os.walk(folder):
+        for f in fns:
+            try:
+                total += os.stat(ospath.join(dp, f)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class DiskBudget:
+    _claims: dict = {}  # task id → peak bytes it was admitted with
+
+    @classmethod
+    def _pending(cls, task: Task) -> int:
+        """Bytes ``task`` claimed but hasn't written yet."""
+        with task.entered():
+            used = _used(Paths.WORK_PATH)
+        return max(cls._claims.get(task.id, 0) - used, 0)
+
+    @classmethod
+    def room(cls) -> int:
+        """Free space left for the current task once the others get their claims."""
+        me = Task.current()
+        others = sum(cls._pending(t) for t in Task.running() if t is not me)
+        return freeSpace() - Disk.reserve - others
+
+    @classmethod
+    async def admit(cls, need: int):
+        """
+        Hold the current task until ``need`` bytes fit, then claim them.
+        A task with no claimed neighbours goes ahead regardless.
+        """
+        task = Task.current()
+        if task is None:
+            return
+        noted = False
+        while need > cls.room() and any(
+            t.id in cls._claims for t in Task.running() if t is not task
+        ):
+            if not noted:
+                noted = True
+                log.info(f"[Disk] Job #{task.id} waits for {sizeUnit(need)} of disk")
+                try:
+                    await MSG.status_msg.edit_text(
+                        "💾 <b>WAITING FOR DISK SPACE</b>\n\n"
+                        f"Needs  <code>{sizeUnit(need)}</code>\n"
+                        f"Free   <code>{sizeUnit(max(cls.room(), 0))}</code>\n\n"
+                        "<i>Starts as soon as the running jobs have made room.</i>"
+                    )
+                except Exception:
+                    pass
+            await sleep(Disk.poll)
+        if need > cls.room():
+            log.warning(f"[Disk] Job #{task.id} may need {sizeUnit(need)}, only {sizeUnit(cls.room())} free")
+        cls._claims[task.id] = need
+
+    @classmethod
+    def release(cls, task: Task):
+        cls._claims.pop(task.id, None)
+
+    @classmethod
+    async def linkGate(cls, num: int, sizes: dict):
+        """
+        Hold batch link ``num`` until its footprint fits next to the links
+        of this task that are still downloading. One link always runs.
+        """
+        need = footprint(sizes.get(num, 0))
+        while Transfer.live:
+            coming = sum(max(sizes.get(n, 0) - done, 0) for n, done in Transfer.live.items())
+            if need + footprint(coming) <= cls.room():
+                return
+            await sleep(Disk.poll)
+
+
+class DiskGuard:
+    """
+    Pauses downloads while free space is below Disk.low_space and some
+    upload is running to free it again (waiting for nothing would hang).
+    """
+    room = Event()  # cleared while paused; download threads wait on it
+    room.set()
+
+    @classmethod
+    def _uploading(cls) -> bool:
+        for task in Task.running():
+            with task.entered():
+                if Transfer.up_live:
+                    return True
+        return False
+
+    @classmethod
+    def check(cls) -> bool:
+        """Refresh ``room`` from the free space; True while downloads may go on."""
+        free = freeSpace()
+        if cls.room.is_set():
+            if free < Disk.low_space and cls._uploading():
+                cls.room.clear()
+                log.warning(f"[Disk] Only {sizeUnit(free)} free — pausing downloads")
+        elif free >= Disk.resume_space or not cls._uploading():
+            cls.room.set()
+            log.info(f"[Disk] {sizeUnit(free)} free — resuming downloads")
+        return cls.room.is_set()
+
+    @classmethod
+    async def wait(cls):
+        """Hold the caller while downloads are paused."""
+        while not cls.check():
+            await sleep(Disk.poll)
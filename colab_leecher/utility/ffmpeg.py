@@ -0,0 +1,133 @@
+"""
+colab_leecher/utility/ffmpeg.py
+Shared async runner for ffmpeg jobs with live progress.
+
+Every job is started with ``-progress pipe:1 -nostats`` so ffmpeg
+reports out_time_us / total_size / speed as key=value blocks on stdout.
+Those are turned into a real percentage and ETA against the input's
+duration and fed to TaskInfo and status_bar, instead of a spinner or
+polling the output folder size. The process is registered with
+ProcessTracker, so cancelTask() kills it.
+"""
+import json
+import logging
+from datetime import datetime
+from asyncio import create_subprocess_exec, ensure_future
+from asyncio.subprocess import PIPE, DEVNULL
+
+from colab_leecher.utility.variables import Messages, ProcessTracker, TaskInfo
+from colab_leecher.utility.helper import getTime, sizeUnit, status_bar
+
+log = logging.getLogger(__name__)
+
+
+class FFmpegError(Exception):
+    pass
+
+
+def _speed(value: str) -> float:
+    """ffmpeg's "1.53x" (or "N/A") as a float."""
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+async def probeMedia(source: str) -> dict:
+    """ffprobe's format and streams of ``source``; empty when it can't be read."""
+    proc = await create_subprocess_exec(
+        "ffprobe", "-v", "error", "-print_format", "json",
+        "-show_format", "-show_streams", source,
+        stdout=PIPE, stderr=DEVNULL,
+    )
+    ProcessTracker.register(proc.pid, "ffprobe")
+    try:
+        out, _ = await proc.communicate()
+    finally:
+        ProcessTracker.unregister(proc.pid)
+    try:
+        return json.loads(out.decode(errors="ignore")) or {}
+    except ValueError:
+        return {}
+
+
+def mediaDuration(info: dict) -> float:
+    try:
+        return float(info.get("format", {}).get("duration") or 0)
+    except ValueError:
+        return 0.0
+
+
+async def reportProgress(done_s: float, duration: float, size: int, speed: float,
+                         engine: str, started: datetime):
+    """Render ffmpeg progress (media seconds done of ``duration``) on the status bar."""
+    percentage = min(done_s / duration * 100, 100) if duration else 0
+    if speed:
+        eta = (duration - done_s) / speed
+    elif done_s:
+        eta = (duration - done_s) * (datetime.now() - started).seconds / done_s
+    else:
+        eta = 0
+    speed_string = f"{speed:.2f}x" if speed else "N/A"
+    TaskInfo.set(
+        phase="process", engine="ffmpeg", done_bytes=size,
+        percentage=percentage, speed=speed_string, eta=getTime(eta),
+    )
+    await status_bar(
+        Messages.status_head,
+        speed_string,
+        percentage,
+        getTime(eta),
+        f"{getTime(done_s)} · {sizeUnit(size)}",
+        getTime(duration) if duration else "?",
+        engine,
+    )
+
+
+async def runFFmpeg(args: list, duration: float = 0, engine: str = "FFmpeg 🏍",
+                    label: str = "ffmpeg", on_progress=None):
+    """
+    Run ``ffmpeg *args`` and wait for it.
+
+    duration     — length of the input in seconds, for percentage and ETA
+    on_progress  — awaited as on_progress(seconds_done, bytes_written, speed)
+                   after every progress block; by default the status bar is
+                   updated directly.
+    Raises FFmpegError with the tail of stderr when ffmpeg fails.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-v", "error",
+        "-progress", "pipe:1", "-nostats", *args,
+    ]
+    started = datetime.now()
+    proc = await create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
+    ProcessTracker.register(proc.pid, label)
+    errors = ensure_future(proc.stderr.read())
+    try:
+        block = {}
+        async for line in proc.stdout:
+            key, _, value = line.decode(errors="ignore").strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+            try:
+                done_s = int(block.get("out_time_us", "0")) / 1_000_000
+            except ValueError:
+                done_s = 0.0
+            size = int(block["total_size"]) if block.get("total_size", "").isdigit() else 0
+            speed = _speed(block.get("speed", "N/A"))
+            block = {}
+            if on_progress is not None:
+                await on_progress(max(done_s, 0.0), size, speed)
+            else:
+                await reportProgress(max(done_s, 0.0), duration, size, speed, engine, started)
+        code = await proc.wait()
+    finally:
+        ProcessTracker.unregister(proc.pid)
+        if proc.returncode is None:
+            proc.kill()
+    err = (await errors).decode(errors="ignore")
+    if code != 0:
+        raise FFmpegError(err[-300:] or f"ffmpeg exited with {code}")
+    if err:
+        log.debug(f"[FFmpeg] {err[-300:]}")
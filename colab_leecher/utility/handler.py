@@ -1,25 +1,180 @@
 import os
+import re
 import shutil
 import logging
 import pathlib
-from asyncio import sleep
-from time import time
+from asyncio import sleep, ensure_future, gather
+from collections import deque
 from colab_leecher import OWNER, colab_bot
 from natsort import natsorted
 from datetime import datetime
 from os import makedirs, path as ospath
-from colab_leecher.uploader.telegram import upload_file
+from pyrogram.errors import FloodWait
+from colab_leecher.uploader.telegram import prepareFile, sendPrepared, uploadCaption
+from colab_leecher.utility.checkpoint import Checkpoints, clearWorkPath
+from colab_leecher.utility.media_info import prefetchMedia
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from colab_leecher.utility.variables import (
-    BOT, MSG, BotTimes, Messages, Paths, Transfer, ProcessTracker, TaskInfo,
+    BOT, MSG, BotTimes, Messages, Paths, Task, Transfer, ProcessTracker, TaskInfo, Telegram,
+)
+from colab_leecher.utility.converters import (
+    MAX_SIZE, archive, byteRanges, extract, sizeChecker, videoConverter, virtualSplit,
 )
-from colab_leecher.utility.converters import archive, extract, videoConverter, sizeChecker
 from colab_leecher.utility.helper import (
     fileType, getSize, getTime, keyboard,
     shortFileName, sizeUnit, sysINFO, _pct_bar,
 )
 
 
+# Downloads that are still being written (or are intermediate files)
+_UNFINISHED = re.compile(r"\.(part|ytdl|temp|aria2)$|\.f\d+\.\w+$|\.temp\.\w+$|\.megatmp")
+
+
+def finishedDownloads(folder_path: str) -> list:
+    """Files under ``folder_path`` whose download has completed."""
+    busy = Checkpoints.paths()
+    ready = []
+    for entry in os.listdir(folder_path):
+        top = ospath.join(folder_path, entry)
+        # A torrent keeps one control file next to its whole directory
+        if ospath.exists(top + ".aria2") or top in busy:
+            continue
+        paths = [top] if ospath.isfile(top) else [
+            str(p) for p in pathlib.Path(top).glob("**/*") if p.is_file()
+        ]
+        for fp in paths:
+            if _UNFINISHED.search(fp) or ospath.exists(fp + ".aria2") or fp in busy:
+                continue
+            ready.append(fp)
+    return natsorted(ready)
+
+
+async def splitEntries(file_path: str, remove: bool) -> list:
+    """
+    Split ``file_path`` if it's too big; return its upload queue entries
+    as (kind, path, span) — span is set for virtual parts of the file.
+    """
+    if ospath.getsize(file_path) > MAX_SIZE and virtualSplit(file_path):
+        name = ospath.basename(shortFileName(file_path))
+        return [
+            ("range", file_path, (offset, length, f"{name}.{str(i + 1).zfill(3)}"))
+            for i, (offset, length) in enumerate(byteRanges(file_path))
+        ]
+    before = set(os.listdir(Paths.temp_zpath)) if ospath.exists(Paths.temp_zpath) else set()
+    if await sizeChecker(file_path, remove):
+        if ospath.exists(file_path) and remove:
+            os.remove(file_path)
+        parts = natsorted(set(os.listdir(Paths.temp_zpath)) - before)
+        return [("split", ospath.join(Paths.temp_zpath, part), None) for part in parts]
+    return [("single", file_path, None)]
+
+
+async def stageFile(file_path: str, remove: bool) -> list:
+    """Convert and split one finished file; return its upload queue entries."""
+    if BOT.Options.convert_video and fileType(file_path) == "video":
+        file_path = await videoConverter(file_path)
+    return await splitEntries(file_path, remove)
+
+
+class UploadPool:
+    """
+    Upload up to Telegram.upload_workers queue entries at once. Each file's
+    bytes are pushed by its own worker, but files are posted to the chat
+    strictly in the order they were submitted.
+    """
+
+    def __init__(self, remove: bool, total: int = 0):
+        self.remove  = remove
+        self.total   = total
+        self.pending = deque()  # prepare futures, in submission order
+        self.active  = {}       # slot → file name being uploaded
+        self.count   = 0
+        self.sent    = 0
+
+    def _head(self) -> str:
+        counter = f"{self.sent} / {self.total}" if self.total else str(self.sent)
+        names = "".join(f"<code>{n}</code>\n" for n in self.active.values())
+        return f"📤 <b>UPLOADING</b>  <i>{counter}</i>\n\n{names}"
+
+    async def _prepare(self, kind: str, file_path: str, span, slot: int):
+        if kind == "range":
+            file_name, new_path = span[2], file_path
+        else:
+            file_name, new_path = self._ready(kind, file_path, slot)
+
+        self.active[slot] = file_name
+        Messages.status_head = self._head()
+        TaskInfo.set(phase="upload", engine="Pyrofork", filename=file_name)
+        while True:
+            try:
+                prep = await prepareFile(new_path, slot, span)
+                break
+            except FloodWait as e:
+                logging.warning(f"FloodWait {e.value}s")
+                await sleep(e.value)
+            except Exception as e:
+                logging.error(f"Upload error: {e}")
+                prep = None
+                break
+        return slot, kind, file_name, new_path, span, prep
+
+    def _ready(self, kind: str, file_path: str, slot: int):
+        """Copy (when the source is kept) and shorten the name of a file to upload."""
+        if kind == "single":
+            # One folder per slot: files of the same name uploading side
+            # by side must not land on (or be shortened to) one path
+            slot_dir = ospath.join(Paths.temp_files_dir, str(slot))
+            if not ospath.exists(slot_dir): makedirs(slot_dir, exist_ok=True)
+            if not self.remove: file_path = shutil.copy(file_path, slot_dir)
+        file_name = ospath.basename(file_path)
+        new_path  = shortFileName(file_path)
+        os.rename(file_path, new_path)
+        return file_name, new_path
+
+    async def _sendNext(self, is_last: bool):
+        slot, kind, file_name, new_path, span, prep = await self.pending.popleft()
+        try:
+            if prep is not None:
+                await sendPrepared(prep, file_name, is_last=is_last)
+                Transfer.up_bytes.append(span[1] if span else os.stat(new_path).st_size)
+        except Exception as e:
+            logging.error(f"Upload error: {e}")
+        finally:
+            Transfer.up_live.pop(slot, None)
+            self.active.pop(slot, None)
+            self.sent += 1
+            Messages.status_head = self._head()
+            if kind == "range":
+                # The source goes once its last virtual part is out
+                offset, length, _ = span
+                if self.remove and ospath.exists(new_path) \
+                        and offset + length == ospath.getsize(new_path):
+                    os.remove(new_path)
+            # Split parts and copies made for !remove are ours to delete
+            elif ospath.exists(new_path): os.remove(new_path)
+
+    async def submit(self, kind: str, file_path: str, span: tuple = None):
+        """Start uploading one entry, posting the oldest one first if the pool is full."""
+        if len(self.pending) >= Telegram.upload_workers:
+            await self._sendNext(is_last=False)
+        # Slots are handed out round-robin; the oldest one was just freed
+        slot = self.count % Telegram.upload_workers
+        self.count += 1
+        self.pending.append(ensure_future(self._prepare(kind, file_path, span, slot)))
+
+    async def drain(self, mark_last: bool = True):
+        """Post everything still in the pool; the final file gets the ✅ Done caption."""
+        while self.pending:
+            await self._sendNext(is_last=mark_last and len(self.pending) == 1)
+
+    async def cancel(self):
+        """Stop the uploads not posted yet and wait until they let go of their files."""
+        for fut in self.pending:
+            fut.cancel()
+        await gather(*self.pending, return_exceptions=True)
+        self.pending.clear()
+
+
 async def Leech(folder_path: str, remove: bool):
     files = [str(p) for p in pathlib.Path(folder_path).glob("**/*") if p.is_file()]
     for f in natsorted(files):
@@ -30,80 +185,46 @@ async def Leech(folder_path: str, remove: bool):
     Transfer.total_down_size = getSize(folder_path)
 
     files = natsorted([str(p) for p in pathlib.Path(folder_path).glob("**/*") if p.is_file()])
-    upload_queue = []
-
-    for f in files:
-        file_path = ospath.join(folder_path, f)
-        leech = await sizeChecker(file_path, remove)
-        if leech:
-            if ospath.exists(file_path) and remove:
-                os.remove(file_path)
-            for part in natsorted(os.listdir(Paths.temp_zpath)):
-                upload_queue.append(("split", ospath.join(Paths.temp_zpath, part)))
-        else:
-            upload_queue.append(("single", file_path))
-
-    total_uploads    = len(upload_queue)
-    split_cleaned    = False
-
-    for idx, (kind, file_path) in enumerate(upload_queue):
-        is_last = (idx == total_uploads - 1)
-
-        # Update TaskInfo for /status panel
-        TaskInfo.set(
-            phase="upload", engine="Pyrofork",
-            filename=ospath.basename(file_path),
-        )
 
-        if kind == "split":
-            file_name = ospath.basename(file_path)
-            new_path  = shortFileName(file_path)
-            os.rename(file_path, new_path)
-            BotTimes.current_time = time()
-            Messages.status_head  = (
-                f"📤 <b>UPLOADING</b>  <i>{idx+1} / {total_uploads}</i>\n\n"
-                f"<code>{file_name}</code>\n"
-            )
-            try:
-                MSG.status_msg = await MSG.status_msg.edit_text(
-                    text=Messages.task_msg + Messages.status_head
-                    + "\n⏳ <i>Starting...</i>" + sysINFO(),
-                    reply_markup=keyboard(),
-                )
-            except Exception: pass
-            await upload_file(new_path, file_name, is_last=is_last)
-            Transfer.up_bytes.append(os.stat(new_path).st_size)
-            if is_last and not split_cleaned:
-                if ospath.exists(Paths.temp_zpath): shutil.rmtree(Paths.temp_zpath)
-                split_cleaned = True
-        else:
-            if not ospath.exists(Paths.temp_files_dir): makedirs(Paths.temp_files_dir)
-            if not remove: file_path = shutil.copy(file_path, Paths.temp_files_dir)
-            file_name = ospath.basename(file_path)
-            new_path  = shortFileName(file_path)
-            os.rename(file_path, new_path)
-            BotTimes.current_time = time()
-            Messages.status_head  = f"📤 <b>UPLOADING</b>\n\n<code>{file_name}</code>\n"
-            try:
-                MSG.status_msg = await MSG.status_msg.edit_text(
-                    text=Messages.task_msg + Messages.status_head
-                    + "\n⏳ <i>Starting...</i>" + sysINFO(),
-                    reply_markup=keyboard(),
-                )
-            except Exception: pass
-            file_size = os.stat(new_path).st_size
-            await upload_file(new_path, file_name, is_last=is_last)
-            Transfer.up_bytes.append(file_size)
-            if remove and ospath.exists(new_path): os.remove(new_path)
-            elif not remove:
-                for fi in os.listdir(Paths.temp_files_dir):
-                    os.remove(ospath.join(Paths.temp_files_dir, fi))
+    # Each file is split only once the pool gets to it, and every file
+    # is deleted once it's posted, so part files never pile up on disk
+    pool = UploadPool(remove, total=len(files))
+    # Thumbnails and metadata of the files that go up whole are made in
+    # upload order, ahead of the pool, while earlier files upload
+    prefetch = ensure_future(prefetchMedia(
+        [f for f in files if ospath.getsize(f) <= MAX_SIZE], Telegram.prefetch
+    ))
+    try:
+        for f in files:
+            entries = await splitEntries(ospath.join(folder_path, f), remove)
+            pool.total += len(entries) - 1
+            for kind, file_path, span in entries:
+                await pool.submit(kind, file_path, span)
+        await pool.drain()
+    finally:
+        await pool.cancel()
+        prefetch.cancel()
+        # let it stop its ffmpeg before the thumbnails folder goes
+        await gather(prefetch, return_exceptions=True)
 
     if remove and ospath.exists(folder_path): shutil.rmtree(folder_path)
-    for d in (Paths.thumbnail_ytdl, Paths.temp_files_dir):
+    for d in (Paths.thumbnail_ytdl, Paths.temp_files_dir, Paths.temp_zpath, Paths.temp_thumbs):
         if ospath.exists(d): shutil.rmtree(d)
 
 
+async def finishLeech():
+    """Mark the last uploaded file as done and drop the status message."""
+    if Transfer.sent_file:
+        try:
+            await Transfer.sent_file[-1].edit_caption(uploadCaption(Transfer.sent_file_names[-1], True))
+        except Exception as e:
+            logging.warning(f"Couldn't mark last upload as done: {e}")
+    try:
+        await MSG.status_msg.delete()
+    except Exception:
+        pass
+
+
 async def Zip_Handler(down_path: str, is_split: bool, remove: bool):
     Messages.status_head = f"🗜 <b>COMPRESSING</b>\n\n<code>{Messages.download_name}</code>\n"
     TaskInfo.set(phase="process", engine="zip", filename=Messages.download_name)
@@ -172,13 +293,14 @@ async def cancelTask(reason: str):
         except Exception as e:
             logging.warning(f"Task cancel: {e}")
 
-    # 3. Also kill any stray aria2c/ffmpeg processes by name
-    _kill_stray_processes()
+    # 3. Also kill any stray aria2c/ffmpeg processes by name — unless
+    #    another task is running, whose processes they could be
+    if len(Task.running()) <= 1:
+        _kill_stray_processes()
 
-    # 4. Cleanup work directory
+    # 4. Cleanup work directory, keeping resumable partial downloads
     try:
-        if ospath.exists(Paths.WORK_PATH):
-            shutil.rmtree(Paths.WORK_PATH)
+        clearWorkPath(BOT.SOURCE)
     except Exception as e:
         logging.warning(f"Cancel cleanup: {e}")
 
@@ -1,5 +1,4 @@
 import os
-import math
 import psutil
 import logging
 from time import time
@@ -10,9 +9,8 @@ from urllib.parse import urlparse
 from asyncio import get_event_loop
 from colab_leecher import colab_bot
 from pyrogram.errors import BadRequest
-from moviepy.video.io.VideoFileClip import VideoFileClip
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
-from colab_leecher.utility.variables import BOT, MSG, BotTimes, Messages, Paths
+from colab_leecher.utility.variables import BOT, MSG, BotTimes, Messages, Paths, Task, Transfer
 
 
 # ──────────────────────────────────────────────
@@ -120,29 +118,16 @@ def videoExtFix(file_path: str):
     os.rename(file_path, new)
     return new
 
-def thumbMaintainer(file_path):
-    if ospath.exists(Paths.VIDEO_FRAME): os.remove(Paths.VIDEO_FRAME)
-    try:
-        fname, _ = ospath.splitext(ospath.basename(file_path))
-        ytdl_thmb = f"{Paths.WORK_PATH}/ytdl_thumbnails/{fname}.webp"
-        with VideoFileClip(file_path) as video:
-            if ospath.exists(Paths.THMB_PATH): return Paths.THMB_PATH, video.duration
-            elif ospath.exists(ytdl_thmb):     return convertIMG(ytdl_thmb), video.duration
-            else:
-                video.save_frame(Paths.VIDEO_FRAME, t=math.floor(video.duration / 2))
-                return Paths.VIDEO_FRAME, video.duration
-    except Exception as e:
-        logging.warning(f"Thumb error: {e}")
-        return (Paths.THMB_PATH if ospath.exists(Paths.THMB_PATH) else Paths.HERO_IMAGE), 0
-
 async def setThumbnail(message):
     try:
         if ospath.exists(Paths.THMB_PATH): os.remove(Paths.THMB_PATH)
         loop = get_event_loop()
         await loop.create_task(message.download(file_name=Paths.THMB_PATH))
         BOT.Setting.thumbnail = True
-        if BOT.State.task_going and MSG.status_msg:
-            await MSG.status_msg.edit_media(InputMediaPhoto(Paths.THMB_PATH), reply_markup=keyboard())
+        for task in Task.running():
+            with task.entered():
+                if MSG.status_msg:
+                    await MSG.status_msg.edit_media(InputMediaPhoto(Paths.THMB_PATH), reply_markup=keyboard())
         return True
     except Exception as e:
         BOT.Setting.thumbnail = False
@@ -251,7 +236,10 @@ def sysINFO():
 #  status_bar  — progress display
 # ──────────────────────────────────────────────
 
-async def status_bar(down_msg, speed, percentage, eta, done, left, engine):
+async def status_bar(down_msg, speed, percentage, eta, done, left, engine, batch=False):
+    # While a batch downloads, only the combined view may edit the message
+    if Transfer.batch and not batch:
+        return
     bar      = _pct_bar(float(percentage), 12)
     s_ico    = _speed_emoji(str(speed))
     pct_f    = float(percentage)
@@ -334,6 +322,7 @@ async def send_settings(client, message, msg_id, command: bool):
 # ──────────────────────────────────────────────
 
 def keyboard():
+    task = Task.current()
     return InlineKeyboardMarkup([[
-        InlineKeyboardButton("❌ Cancel Task", callback_data="cancel"),
+        InlineKeyboardButton("❌ Cancel Task", callback_data=f"cancel_{task.id}" if task else "cancel"),
     ]])
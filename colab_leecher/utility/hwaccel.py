@@ -0,0 +1,113 @@
+"""
+colab_leecher/utility/hwaccel.py
+One-time probe of the video encoders this runtime can actually use.
+
+The converter used to call GPUtil.getAvailable() (a fresh nvidia-smi
+run) for every file and assumed NVENC whenever exactly one GPU showed
+up, without checking that the installed ffmpeg was built with it. Here
+``ffmpeg -encoders`` / ``-hwaccels``, the GPU count and their free
+memory are read once (at startup, or on first use) and memoized, and
+the converter asks for the best encoder: h264_nvenc, h264_vaapi or
+libx264, with the matching arguments.
+"""
+import os
+import logging
+import subprocess
+from typing import NamedTuple
+
+log = logging.getLogger(__name__)
+
+NVENC_MIN_FREE_MB = 512       # leave NVENC alone on a GPU that's nearly full
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+
+class VideoEncoder(NamedTuple):
+    name: str           # ffmpeg encoder
+    core: str           # "GPU" / "CPU", for the status view
+    input_args: list    # go before -i
+    output_args: list   # codec (and filter) arguments
+
+
+class Capabilities(NamedTuple):
+    encoders: frozenset
+    hwaccels: frozenset
+    gpus: int
+    gpu_free_mb: tuple
+
+
+def _run(cmd: list) -> str:
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=20).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        log.debug(f"[HWAccel] {cmd[0]}: {e}")
+        return ""
+
+
+def _encoders() -> frozenset:
+    # " V....D h264_nvenc           NVIDIA NVENC H.264 encoder"
+    names = set()
+    for line in _run(["ffmpeg", "-hide_banner", "-encoders"]).splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in "VAS":
+            names.add(parts[1])
+    return frozenset(names)
+
+
+def _hwaccels() -> frozenset:
+    out = _run(["ffmpeg", "-hide_banner", "-hwaccels"]).splitlines()
+    return frozenset(l.strip() for l in out if l.strip() and not l.endswith(":"))
+
+
+def _gpu_free_mb() -> tuple:
+    out = _run([
+        "nvidia-smi", "--query-gpu=memory.free", "--format=csv,noheader,nounits",
+    ])
+    free = []
+    for line in out.splitlines():
+        try:
+            free.append(int(line.strip()))
+        except ValueError:
+            pass
+    return tuple(free)
+
+
+class HWAccel:
+    _caps: Capabilities = None
+
+    @classmethod
+    def detect(cls, refresh: bool = False) -> Capabilities:
+        """Probe once and remember the result; ``refresh`` probes again."""
+        if cls._caps is None or refresh:
+            free = _gpu_free_mb()
+            cls._caps = Capabilities(
+                encoders=_encoders(),
+                hwaccels=_hwaccels(),
+                gpus=len(free),
+                gpu_free_mb=free,
+            )
+            log.info(
+                f"[HWAccel] {cls._caps.gpus} GPU(s), encoder: {cls.encoder(False).name}"
+            )
+        return cls._caps
+
+    @classmethod
+    def encoder(cls, high_quality: bool) -> VideoEncoder:
+        """Best H.264 encoder available, with its (lossless when ``high_quality``) settings."""
+        caps = cls.detect()
+        if "h264_nvenc" in caps.encoders and any(
+            free >= NVENC_MIN_FREE_MB for free in caps.gpu_free_mb
+        ):
+            quality = ["-preset", "slow", "-qp", "0"] if high_quality else []
+            return VideoEncoder("h264_nvenc", "GPU", [], ["-c:v", "h264_nvenc", *quality])
+
+        if "h264_vaapi" in caps.encoders and "vaapi" in caps.hwaccels \
+                and os.path.exists(VAAPI_DEVICE):
+            quality = ["-qp", "1"] if high_quality else []
+            return VideoEncoder(
+                "h264_vaapi", "GPU",
+                ["-vaapi_device", VAAPI_DEVICE],
+                ["-vf", "format=nv12,hwupload", "-c:v", "h264_vaapi", *quality],
+            )
+
+        quality = ["-preset", "slow", "-qp", "0"] if high_quality else []
+        return VideoEncoder("libx264", "CPU", [], ["-c:v", "libx264", *quality])
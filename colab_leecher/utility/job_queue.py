@@ -0,0 +1,133 @@
+"""
+colab_leecher/utility/job_queue.py
+Persistent FIFO of leech jobs.
+
+Links sent while a task is running are queued instead of rejected. Each
+job carries its own sources, mode and options (custom name, zip and
+unzip passwords), so what is set for a queued link never leaks into the
+running task. The queue is saved under BASE_DIR/data, survives a
+restart, and the dispatcher in __main__ runs the jobs back to back.
+"""
+import os
+import json
+import logging
+from time import time
+from os import path as ospath
+from dataclasses import dataclass, field, asdict
+
+from colab_leecher.utility.variables import Paths
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    sources: list
+    type: str = "normal"        # normal / zip / unzip / undzip
+    mode: str = "leech"         # leech / mirror / dir-leech
+    ytdl: bool = False
+    custom_name: str = ""
+    zip_pswd: str = ""
+    unzip_pswd: str = ""
+    id: int = 0
+    added: float = field(default_factory=time)
+
+    @property
+    def label(self) -> str:
+        links = [l for l in self.sources if l.strip()]
+        first = self.custom_name or (links[0] if links else "—")
+        more  = f" +{len(links) - 1}" if len(links) > 1 else ""
+        return f"{first[:45]}{'…' if len(first) > 45 else ''}{more}"
+
+
+class JobQueue:
+    _jobs: list = []; _nid: int = 1
+    _drafts: dict = {}  # mode prompt message id → link waiting for its mode
+    max_drafts = 20     # prompts nobody answered are dropped oldest first
+
+    @classmethod
+    def _load(cls):
+        try:
+            with open(Paths.job_queue) as f: raw = json.load(f)
+            for d in raw.get("j", []):
+                try: cls._jobs.append(Job(**d))
+                except TypeError: pass
+            cls._nid = raw.get("n", max((j.id for j in cls._jobs), default=0) + 1)
+        except FileNotFoundError: pass
+        except Exception as e: log.warning(f"[JobQueue] {e}")
+
+    @classmethod
+    def _save(cls):
+        os.makedirs(ospath.dirname(Paths.job_queue), exist_ok=True)
+        tmp = Paths.job_queue + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"j": [asdict(j) for j in cls._jobs], "n": cls._nid}, f, indent=2)
+        os.replace(tmp, Paths.job_queue)
+
+    @classmethod
+    def add(cls, job: Job) -> int:
+        """Append ``job``; returns its 1-based position."""
+        job.id = cls._nid; cls._nid += 1
+        cls._jobs.append(job); cls._save()
+        return len(cls._jobs)
+
+    @classmethod
+    def remove(cls, jid: int) -> bool:
+        for j in cls._jobs:
+            if j.id == jid:
+                cls._jobs.remove(j); cls._save(); return True
+        return False
+
+    @classmethod
+    def move(cls, jid: int, position: int) -> bool:
+        """Put job ``jid`` at 1-based ``position`` (clamped to the queue)."""
+        job = cls.get(jid)
+        if job is None: return False
+        cls._jobs.remove(job)
+        cls._jobs.insert(min(max(position, 1), len(cls._jobs) + 1) - 1, job)
+        cls._save()
+        return True
+
+    @classmethod
+    def pop(cls):
+        """Take the next job off the front, or None when the queue is empty."""
+        if not cls._jobs: return None
+        job = cls._jobs.pop(0); cls._save()
+        return job
+
+    @classmethod
+    def get(cls, jid: int):
+        return next((j for j in cls._jobs if j.id == jid), None)
+
+    @classmethod
+    def position(cls, jid: int) -> int:
+        return next((i for i, j in enumerate(cls._jobs, 1) if j.id == jid), 0)
+
+    @classmethod
+    def all(cls): return list(cls._jobs)
+
+    @classmethod
+    def putDraft(cls, prompt_id: int, job: Job):
+        """Park ``job`` until a mode is picked on prompt message ``prompt_id``."""
+        cls._drafts.pop(prompt_id, None)
+        cls._drafts[prompt_id] = job
+        while len(cls._drafts) > cls.max_drafts:
+            cls._drafts.pop(next(iter(cls._drafts)))
+
+    @classmethod
+    def draft(cls, prompt_id: int):
+        return cls._drafts.get(prompt_id)
+
+    @classmethod
+    def takeDraft(cls, prompt_id: int):
+        """Remove and return the draft of prompt ``prompt_id`` (None if gone)."""
+        return cls._drafts.pop(prompt_id, None)
+
+    @classmethod
+    def setOption(cls, name: str, value: str) -> bool:
+        """Set an option of the newest draft; False when there's none."""
+        if not cls._drafts: return False
+        setattr(next(reversed(cls._drafts.values())), name, value)
+        return True
+
+JobQueue._load()
@@ -0,0 +1,163 @@
+"""
+colab_leecher/utility/media_info.py
+Lightweight media metadata and thumbnails for the uploader.
+
+One async ffprobe gives duration, width and height, and one fast-seek
+``ffmpeg -ss … -frames:v 1`` grabs a frame already scaled to Telegram's
+320px thumbnail box. Nothing is decoded in Python and the event loop is
+never blocked. Probes and frames are keyed by the file's inode, mtime
+and size, so they survive the renames done before uploading, and
+concurrent lookups of one file share a single job. That lets Leech
+prefetch the next files' thumbnails while earlier ones upload; every
+file gets its own frame under Paths.temp_thumbs.
+"""
+import os
+import logging
+from os import path as ospath
+from asyncio import Queue, ensure_future, gather, shield
+
+from colab_leecher.utility.variables import Paths
+from colab_leecher.utility.helper import convertIMG, fileType
+from colab_leecher.utility.ffmpeg import FFmpegError, mediaDuration, probeMedia, runFFmpeg
+
+log = logging.getLogger(__name__)
+
+THUMB_BOX = 320  # Telegram thumbnails are at most 320px on each side
+
+_info: dict = {}    # file key → Future of {"duration", "width", "height"}
+_frames: dict = {}  # file key → Future of the grabbed frame's path (or None)
+_waiters: dict = {}  # Future → callers awaiting it
+
+
+def _key(file_path: str) -> tuple:
+    st = os.stat(file_path)
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+async def _once(store: dict, key: tuple, factory):
+    """
+    Run ``factory()`` once per key; later and concurrent callers share it.
+    A job its last caller gave up on is cancelled, and neither that nor a
+    failed job is kept, so the next caller starts afresh.
+    """
+    fut = store.get(key)
+    if fut is None:
+        fut = store[key] = ensure_future(factory())
+    _waiters[fut] = _waiters.get(fut, 0) + 1
+    try:
+        return await shield(fut)
+    except BaseException:
+        if not fut.done() and _waiters[fut] == 1:
+            fut.cancel()
+        if fut.done() or _waiters[fut] == 1:
+            if store.get(key) is fut:
+                del store[key]
+        raise
+    finally:
+        _waiters[fut] -= 1
+        if not _waiters[fut]:
+            del _waiters[fut]
+
+
+def resetMediaCache():
+    _info.clear()
+    _frames.clear()
+
+
+async def mediaInfo(file_path: str) -> dict:
+    """{"duration", "width", "height"} of a media file; zeros when unreadable."""
+    async def probe():
+        info = await probeMedia(file_path)
+        if not info:
+            # Raised, not cached: the file may still be being written
+            raise FFmpegError(f"ffprobe can't read {ospath.basename(file_path)}")
+        meta = {"duration": mediaDuration(info), "width": 0, "height": 0}
+        for s in info.get("streams", []):
+            if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic"):
+                meta["width"], meta["height"] = s.get("width") or 0, s.get("height") or 0
+                break
+        return meta
+
+    try:
+        return await _once(_info, _key(file_path), probe)
+    except FFmpegError as e:
+        log.debug(f"[MediaInfo] {e}")
+        return {"duration": 0, "width": 0, "height": 0}
+
+
+async def _quiet(*_):
+    pass
+
+
+async def grabFrame(file_path: str, out_file: str, at: float) -> bool:
+    """Save the frame at ``at`` seconds, scaled down to the thumbnail box."""
+    if ospath.exists(out_file):
+        os.remove(out_file)
+    try:
+        await runFFmpeg(
+            ["-y", "-ss", f"{at:.3f}", "-i", file_path, "-frames:v", "1",
+             "-vf", f"scale={THUMB_BOX}:{THUMB_BOX}:force_original_aspect_ratio=decrease",
+             "-q:v", "3", out_file],
+            label="ffmpeg thumb", on_progress=_quiet,
+        )
+    except FFmpegError as e:
+        log.warning(f"[MediaInfo] frame of {ospath.basename(file_path)}: {e}")
+    return ospath.exists(out_file) and ospath.getsize(out_file) > 0
+
+
+async def videoFrame(file_path: str, duration: float):
+    """This file's own mid-point frame, grabbed once."""
+    key = _key(file_path)
+    out_file = ospath.join(Paths.temp_thumbs, f"{key[1]}_{key[2]}.jpg")
+
+    async def grab():
+        os.makedirs(Paths.temp_thumbs, exist_ok=True)
+        return out_file if await grabFrame(file_path, out_file, duration / 2) else None
+
+    if key in _frames and _frames[key].done() and not ospath.exists(out_file):
+        del _frames[key]  # thumbnails were cleaned up since
+    return await _once(_frames, key, grab)
+
+
+async def thumbMaintainer(file_path):
+    """Thumbnail for a video (custom, yt-dlp's or its own frame) and its duration."""
+    duration = 0
+    try:
+        duration = (await mediaInfo(file_path))["duration"]
+        fname, _ = ospath.splitext(ospath.basename(file_path))
+        ytdl_thmb = f"{Paths.WORK_PATH}/ytdl_thumbnails/{fname}.webp"
+        if ospath.exists(Paths.THMB_PATH):
+            return Paths.THMB_PATH, duration
+        elif ospath.exists(ytdl_thmb):
+            return convertIMG(ytdl_thmb), duration
+        frame = await videoFrame(file_path, duration)
+        if frame:
+            return frame, duration
+    except Exception as e:
+        logging.warning(f"Thumb error: {e}")
+    return (Paths.THMB_PATH if ospath.exists(Paths.THMB_PATH) else Paths.HERO_IMAGE), duration
+
+
+async def prefetchMedia(paths, ahead: int = 2):
+    """
+    Work out thumbnails and metadata of upcoming videos in the background,
+    ``ahead`` at a time and in upload order, so the uploader finds them ready.
+    ``paths`` is a list, or a Queue that is fed as files come and ends with None.
+    """
+    if not isinstance(paths, Queue):
+        queue = Queue()
+        for p in [*paths, None]:
+            queue.put_nowait(p)
+        paths = queue
+
+    async def worker():
+        while (file_path := await paths.get()) is not None:
+            if not ospath.exists(file_path) or fileType(file_path) != "video":
+                continue
+            try:
+                await thumbMaintainer(file_path)
+            except Exception as e:
+                log.debug(f"[MediaInfo] prefetch {file_path}: {e}")
+        paths.put_nowait(None)  # lets the other workers stop too
+
+    await gather(*(worker() for _ in range(ahead)))
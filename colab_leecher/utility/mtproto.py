@@ -0,0 +1,73 @@
+"""
+colab_leecher/utility/mtproto.py
+Pool of extra MTProto media sessions for parallel file transfers.
+
+Pyrogram moves a file over a single media session. The parallel
+download/upload engines open several sessions per DC instead (each one
+is its own TCP connection) and keep parts in flight on all of them.
+Sessions to a foreign DC share one auth key, which is authorized once
+through auth.ExportAuthorization / auth.ImportAuthorization.
+"""
+import asyncio
+import logging
+
+from pyrogram import raw
+from pyrogram.session import Auth, Session
+
+from colab_leecher import colab_bot
+
+log = logging.getLogger(__name__)
+
+_pool: dict = {}   # dc_id → [Session, ...]
+_lock = asyncio.Lock()
+
+
+async def _authorized_key(dc_id: int, test_mode: bool):
+    if dc_id == await colab_bot.storage.dc_id():
+        return await colab_bot.storage.auth_key(), False
+    return await Auth(colab_bot, dc_id, test_mode).create(), True
+
+
+async def mediaSessions(dc_id: int, count: int) -> list:
+    """Return ``count`` started media sessions to ``dc_id``, opening more if needed."""
+    async with _lock:
+        sessions = [s for s in _pool.get(dc_id, []) if s.is_started.is_set()]
+        if len(sessions) >= count:
+            _pool[dc_id] = sessions
+            return sessions[:count]
+
+        test_mode = await colab_bot.storage.test_mode()
+        if sessions:
+            auth_key, foreign = sessions[0].auth_key, False
+        else:
+            auth_key, foreign = await _authorized_key(dc_id, test_mode)
+
+        while len(sessions) < count:
+            session = Session(colab_bot, dc_id, auth_key, test_mode, is_media=True)
+            await session.start()
+            if foreign:
+                exported = await colab_bot.invoke(
+                    raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+                )
+                await session.invoke(
+                    raw.functions.auth.ImportAuthorization(
+                        id=exported.id, bytes=exported.bytes
+                    )
+                )
+                foreign = False
+            sessions.append(session)
+
+        log.info(f"[MTProto] {len(sessions)} media session(s) open to DC{dc_id}")
+        _pool[dc_id] = sessions
+        return sessions
+
+
+async def closeSessions():
+    async with _lock:
+        for sessions in _pool.values():
+            for session in sessions:
+                try:
+                    await session.stop()
+                except Exception:
+                    pass
+        _pool.clear()
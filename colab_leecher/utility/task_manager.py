@@ -1,11 +1,16 @@
+import os
 import pytz
 import shutil
 import logging
 from time import time
 from datetime import datetime
-from asyncio import sleep
+from asyncio import Queue, sleep, ensure_future, gather
 from os import makedirs, path as ospath, system
 from colab_leecher import OWNER, colab_bot
+from colab_leecher.utility.checkpoint import clearWorkPath
+from colab_leecher.utility.converters import MAX_SIZE
+from colab_leecher.utility.disk import DiskBudget, footprint
+from colab_leecher.utility.media_info import prefetchMedia, resetMediaCache
 from colab_leecher.downlader.manager import calDownSize, get_d_name, downloadManager
 from colab_leecher.utility.helper import (
     getSize, applyCustomName, keyboard, sysINFO,
@@ -14,9 +19,10 @@ from colab_leecher.utility.helper import (
 )
 from colab_leecher.utility.handler import (
     Leech, Unzip_Handler, Zip_Handler, SendLogs, cancelTask,
+    UploadPool, finishedDownloads, finishLeech, stageFile,
 )
 from colab_leecher.utility.variables import (
-    BOT, MSG, BotTimes, Messages, Paths, Aria2c, Transfer, TaskError,
+    BOT, MSG, BotTimes, Messages, Paths, Aria2c, Task, Transfer, TaskError, Gdrive, Telegram,
 )
 
 
@@ -42,6 +48,16 @@ async def taskScheduler():
     Transfer.sent_file_names = []
     Transfer.down_bytes      = [0, 0]
     Transfer.up_bytes        = [0, 0]
+    Transfer.up_live         = {}
+    Transfer.link_sizes      = {}
+    Transfer.down_heads      = {}
+    Transfer.down_started    = {}
+    # Drive listings and media probes are shared by the running jobs;
+    # they're only dropped when no other job may still be reading them
+    if len(Task.running()) <= 1:
+        Gdrive.meta.clear()
+        Gdrive.children.clear()
+        resetMediaCache()
 
     # Validate dir-leech
     if is_dir:
@@ -55,11 +71,10 @@ async def taskScheduler():
         Transfer.total_down_size = getSize(BOT.SOURCE[0])
         Messages.download_name   = ospath.basename(BOT.SOURCE[0])
 
-    # Prepare work directory
-    if ospath.exists(Paths.WORK_PATH):
-        shutil.rmtree(Paths.WORK_PATH)
-    makedirs(Paths.WORK_PATH)
-    makedirs(Paths.down_path)
+    # Prepare work directory (partial downloads of these links survive)
+    clearWorkPath(BOT.SOURCE)
+    makedirs(Paths.WORK_PATH, exist_ok=True)
+    makedirs(Paths.down_path, exist_ok=True)
 
     # ── No task-log message, no hero photo.
     # MSG.status_msg was already sent by __main__ as "⏳ Starting..."
@@ -67,6 +82,16 @@ async def taskScheduler():
 
     await calDownSize(BOT.SOURCE)
 
+    # Wait for disk room: a pipelined batch only holds a link or so at a time,
+    # a directory leech only writes what its mode adds to the source
+    if BOT.Mode.mode != "mirror" and isPipelined(BOT.SOURCE, is_dir, is_zip or is_unzip or is_dualzip):
+        need = footprint(max(Transfer.link_sizes.values(), default=0))
+    elif is_dir:
+        need = footprint(Transfer.total_down_size) - Transfer.total_down_size
+    else:
+        need = footprint(Transfer.total_down_size)
+    await DiskBudget.admit(need)
+
     if not is_dir:
         await get_d_name(BOT.SOURCE[0])
     else:
@@ -111,6 +136,8 @@ async def Do_Leech(source, is_dir, is_ytdl, is_zip, is_unzip, is_dualzip):
                     shutil.copy(s, Paths.temp_dirleech_path)
                     Messages.download_name = ospath.basename(s)
                     await Leech(Paths.temp_dirleech_path, True)
+    elif isPipelined(source, is_dir, is_zip or is_unzip or is_dualzip):
+        await pipelineLeech(source, is_ytdl)
     else:
         await downloadManager(source, is_ytdl)
         Transfer.total_down_size = getSize(Paths.down_path)
@@ -132,6 +159,69 @@ async def Do_Leech(source, is_dir, is_ytdl, is_zip, is_unzip, is_dualzip):
     await SendLogs(True)
 
 
+def isPipelined(source, is_dir: bool, is_archive: bool) -> bool:
+    """Whether a leech uploads each link's files while the others download."""
+    return not (is_dir or is_archive) and len(source) > 1 \
+        and len(BOT.Options.custom_name) == 0
+
+
+async def pipelineLeech(source, is_ytdl):
+    """
+    Leech a multi-link task without waiting for the whole batch: every
+    time a link finishes, its completed files are moved out of the
+    download folder and converted, split and uploaded while the other
+    links keep downloading.
+    """
+    pending = Queue()
+    upcoming = Queue()  # files for the prefetch, in upload order
+    makedirs(Paths.temp_pipe_path, exist_ok=True)
+
+    def collect():
+        for fp in finishedDownloads(Paths.down_path):
+            dest = ospath.join(Paths.temp_pipe_path, ospath.relpath(fp, Paths.down_path))
+            makedirs(ospath.dirname(dest), exist_ok=True)
+            os.replace(fp, dest)
+            pending.put_nowait(dest)
+            # converted or split videos are new files, nothing to prefetch
+            if not BOT.Options.convert_video and ospath.getsize(dest) <= MAX_SIZE:
+                upcoming.put_nowait(dest)
+
+    async def uploader():
+        while True:
+            file_path = await pending.get()
+            if file_path is None:
+                return await pool.drain(mark_last=False)
+            try:
+                entries = await stageFile(file_path, True)
+                for kind, path, span in entries:
+                    await pool.submit(kind, path, span)
+            except Exception as e:
+                logging.error(f"Pipeline upload of {file_path} failed: {e}")
+
+    pool = UploadPool(True)
+    consumer = ensure_future(uploader())
+    # One prefetch runs ahead of the uploader over every collected file
+    prefetch = ensure_future(prefetchMedia(upcoming, Telegram.prefetch))
+    try:
+        await downloadManager(source, is_ytdl, on_done=collect)
+        collect()
+        pending.put_nowait(None)
+        upcoming.put_nowait(None)
+        await consumer
+    finally:
+        consumer.cancel()
+        prefetch.cancel()
+        # the consumer may still be submitting, and the prefetch must stop
+        # its ffmpeg, before the pool is emptied and the folders go
+        await gather(consumer, prefetch, return_exceptions=True)
+        await pool.cancel()
+
+    await finishLeech()
+    for d in (Paths.temp_pipe_path, Paths.down_path, Paths.thumbnail_ytdl,
+              Paths.temp_files_dir, Paths.temp_zpath, Paths.temp_thumbs):
+        if ospath.exists(d): shutil.rmtree(d)
+
+
 async def Do_Mirror(source, is_ytdl, is_zip, is_unzip, is_dualzip):
     if not ospath.exists(Paths.MOUNTED_DRIVE):
         await cancelTask("Google Drive not mounted.")
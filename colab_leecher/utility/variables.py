@@ -1,9 +1,54 @@
+from copy import copy
 from time import time
 from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pyrogram.types import Message
 
 
-class BOT:
+_current = ContextVar("task", default=None)
+_scoped: list = []  # every TaskScoped class
+
+
+class TaskScoped(type):
+    """
+    Metaclass of the task state holders below (BOT, Transfer, Paths, ...).
+
+    Outside a task they are the plain class singletons they always were.
+    Inside one (see Task.entered) writes land in that task's own namespace
+    and reads fall back to the class values. Lists and dicts start out as
+    fresh copies of the class body's defaults, never of what was put in
+    the shared ones since (e.g. the aria2 daemon's PID), so tasks running
+    side by side never share counters, processes, paths or messages.
+    Asyncio tasks inherit the context they are created in; threads have
+    to be started through copy_context().run.
+    """
+    def __init__(cls, name, bases, body):
+        super().__init__(name, bases, body)
+        type.__setattr__(cls, "__fresh__", {
+            k: copy(v) for k, v in body.items()
+            if not k.startswith("__") and isinstance(v, (list, dict, set))
+        })
+        _scoped.append(cls)
+
+    def __getattribute__(cls, name):
+        task = _current.get()
+        if task is None or name.startswith("__"):
+            return type.__getattribute__(cls, name)
+        ns = task.scope(cls)
+        if name in ns:
+            return ns[name]
+        return type.__getattribute__(cls, name)
+
+    def __setattr__(cls, name, value):
+        task = _current.get()
+        if task is None or name.startswith("__"):
+            type.__setattr__(cls, name, value)
+        else:
+            task.scope(cls)[name] = value
+
+
+class BOT(metaclass=TaskScoped):
     SOURCE = []
     TASK = None
     class Setting:
@@ -16,7 +61,7 @@ class BOT:
         suffix = ""
         thumbnail = False
 
-    class Options:
+    class Options(metaclass=TaskScoped):
         stream_upload = True
         convert_video = True
         convert_quality = False
@@ -26,20 +71,21 @@ class BOT:
         custom_name = ""
         zip_pswd = ""
         unzip_pswd = ""
+        virtual_split = True  # upload oversized files as byte ranges, no part files
 
-    class Mode:
+    class Mode(metaclass=TaskScoped):
         mode = "leech"
         type = "normal"
         ytdl = False
 
-    class State:
+    class State(metaclass=TaskScoped):
         started = False
         task_going = False
         prefix = False
         suffix = False
 
 
-class YTDL:
+class YTDL(metaclass=TaskScoped):
     header = ""
     speed = ""
     percentage = 0.0
@@ -48,30 +94,37 @@ class YTDL:
     left = ""
 
 
-class Transfer:
+class Transfer(metaclass=TaskScoped):
     down_bytes = [0, 0]
     up_bytes = [0, 0]
+    up_live = {}         # upload slot → bytes of its current file sent so far
+    up_started = {}      # upload slot → when its current file started
     total_down_size = 0
     sent_file = []
     sent_file_names = []
+    batch = False        # True while a multi-link batch downloads concurrently
+    live = {}            # link number → bytes downloaded so far (in flight)
+    link_sizes = {}      # link → size calDownSize found for it (0 when unknown)
+    down_heads = {}      # link number → status header of its download
+    down_started = {}    # link number → when its download started
+    finished_links = 0
 
 
-class TaskError:
+class TaskError(metaclass=TaskScoped):
     state = False
     text = ""
 
 
-class BotTimes:
+class BotTimes(metaclass=TaskScoped):
     current_time = time()
     start_time = datetime.now()
     task_start = datetime.now()
 
 
-class Paths:
+class Paths(metaclass=TaskScoped):
     BASE_DIR = "/content/zilong"
     WORK_PATH = f"{BASE_DIR}/BOT_WORK"
     THMB_PATH = f"{BASE_DIR}/colab_leecher/Thumbnail.jpg"
-    VIDEO_FRAME = f"{WORK_PATH}/video_frame.jpg"
     HERO_IMAGE = f"{WORK_PATH}/Hero.jpg"
     DEFAULT_HERO = f"{BASE_DIR}/custom_thmb.jpg"
     MOUNTED_DRIVE = "/content/drive"
@@ -82,11 +135,15 @@ class Paths:
     temp_zpath = f"{WORK_PATH}/Leeched_Files"
     temp_unzip_path = f"{WORK_PATH}/Unzipped_Files"
     temp_files_dir = f"{WORK_PATH}/leech_temp"
+    temp_pipe_path = f"{WORK_PATH}/Pipeline"
     thumbnail_ytdl = f"{WORK_PATH}/ytdl_thumbnails"
+    temp_thumbs = f"{WORK_PATH}/thumbnails"
     access_token = "/content/token.pickle"
+    checkpoints = f"{BASE_DIR}/data/checkpoints.json"
+    job_queue = f"{BASE_DIR}/data/job_queue.json"
 
 
-class Messages:
+class Messages(metaclass=TaskScoped):
     caution_msg = "\n\n<i>💖 When I'm Doin This, Do Something Else ! <b>Because, Time Is Precious ✨</b></i>"
     download_name = ""
     task_msg = ""
@@ -96,7 +153,7 @@ class Messages:
     link_p = ""
 
 
-class MSG:
+class MSG(metaclass=TaskScoped):
     sent_msg = Message(id=1)
     status_msg = Message(id=2)
 
@@ -104,17 +161,44 @@ class MSG:
 class Aria2c:
     link_info = False
     pic_dwn_url = "https://picsum.photos/900/600"
+    rpc_port = 6800
+    max_concurrent = 8
 
 
 class Gdrive:
-    service = None
+    creds = None
+    meta = {}      # file id → metadata, memoized while jobs run
+    children = {}  # folder id → listed child items
+    folder_workers = 4  # files fetched concurrently from one Drive folder
+    range_workers = 8   # byte ranges fetched concurrently for one large file
+    range_threshold = 512 * 1024 * 1024
+    range_part = 64 * 1024 * 1024
+
+
+class Telegram:
+    sessions = 4               # media sessions per DC for parallel transfers
+    parts_in_flight = 8        # GetFile / SaveBigFilePart requests in flight
+    part_size = 1024 * 1024    # GetFile limit (multiple of 4 KiB, max 1 MiB)
+    min_parallel_size = 10 * 1024 * 1024
+    upload_workers = 3         # files uploading at once (posted in order)
+    prefetch = 2               # upcoming videos whose thumbnails are made ahead
+
+
+class Disk:
+    reserve = 2 * 1024**3       # never planned away from the free space
+    low_space = 1024**3         # downloads pause below this much free space...
+    resume_space = 3 * 1024**3  # ...and go on once uploads freed this much
+    poll = 5                    # seconds between free-space checks while waiting
+    # Peak disk use per downloaded byte: archives and extractions keep the
+    # source next to the result, UnDoubleZip keeps three copies
+    factors = {"normal": 1.0, "zip": 2.0, "unzip": 2.0, "undzip": 3.0}
 
 
 # ═════════════════════════════════════════════════════════════
 # ProcessTracker — tracks ALL subprocesses so /cancel kills them
 # ═════════════════════════════════════════════════════════════
 
-class ProcessTracker:
+class ProcessTracker(metaclass=TaskScoped):
     """
     Global registry of running subprocess PIDs.
     When cancelTask() fires, it kills EVERY tracked process — not just
@@ -185,7 +269,7 @@ class ProcessTracker:
 # TaskInfo — live task state for /status panel
 # ═════════════════════════════════════════════════════════════
 
-class TaskInfo:
+class TaskInfo(metaclass=TaskScoped):
     """Structured live task state — updated by download/upload code."""
     phase:      str   = "idle"       # idle | download | upload | process | zip | extract
     engine:     str   = ""           # aria2c | yt-dlp | gdrive | telegram | ffmpeg
@@ -214,3 +298,85 @@ class TaskInfo:
         for k, v in kw.items():
             if hasattr(cls, k):
                 setattr(cls, k, v)
+
+
+# ═════════════════════════════════════════════════════════════
+# Task — one running job and its own copy of the state above
+# ═════════════════════════════════════════════════════════════
+
+def workPaths(root: str) -> dict:
+    """The per-task Paths of a task working under ``root``."""
+    return {
+        "WORK_PATH":          root,
+        "down_path":          f"{root}/Downloads",
+        "temp_dirleech_path": f"{root}/dir_leech_temp",
+        "temp_zpath":         f"{root}/Leeched_Files",
+        "temp_unzip_path":    f"{root}/Unzipped_Files",
+        "temp_files_dir":     f"{root}/leech_temp",
+        "temp_pipe_path":     f"{root}/Pipeline",
+        "thumbnail_ytdl":     f"{root}/ytdl_thumbnails",
+        "temp_thumbs":        f"{root}/thumbnails",
+    }
+
+
+class Task:
+    """
+    A running job. Task slot 0 works in the usual WORK_PATH, so partial
+    downloads resume exactly as before; slot N works in WORK_PATH_N next
+    to it. ``slots`` jobs run at once.
+    """
+    slots = 2
+    _running: dict = {}  # task id → Task
+
+    def __init__(self, tid: int):
+        busy = {t.slot for t in Task._running.values()}
+        self.id   = tid
+        self.slot = next(i for i in range(len(busy) + 1) if i not in busy)
+        self._ns  = {
+            cls: {k: copy(v) for k, v in type.__getattribute__(cls, "__fresh__").items()}
+            for cls in _scoped
+        }
+        root = Paths.WORK_PATH if self.slot == 0 else f"{Paths.WORK_PATH}_{self.slot}"
+        self.scope(Paths).update(workPaths(root))
+        Task._running[tid] = self
+
+    def scope(self, cls) -> dict:
+        return self._ns.setdefault(cls, {})
+
+    @property
+    def sources(self) -> list:
+        return self.scope(BOT).get("SOURCE", [])
+
+    @contextmanager
+    def entered(self):
+        """Make this the current task for the code in the ``with`` block."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def close(self):
+        Task._running.pop(self.id, None)
+
+    @staticmethod
+    @contextmanager
+    def detached():
+        """Reach the shared (non-task) state, e.g. for processes every task uses."""
+        token = _current.set(None)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    @classmethod
+    def current(cls):
+        return _current.get()
+
+    @classmethod
+    def get(cls, tid: int):
+        return cls._running.get(tid)
+
+    @classmethod
+    def running(cls) -> list:
+        return sorted(cls._running.values(), key=lambda t: t.id)
@@ -0,0 +1,74 @@
+"""
+tests/test_hwaccel.py
+HWAccel on a runtime without a GPU or hardware encoders.
+"""
+import subprocess
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+# hwaccel only needs the standard library; load it by path so the test
+# doesn't go through colab_leecher/__init__ (bot client, credentials)
+_spec = importlib.util.spec_from_file_location(
+    "hwaccel", Path(__file__).parents[1] / "colab_leecher" / "utility" / "hwaccel.py"
+)
+hwaccel = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(hwaccel)
+
+ENCODERS = """Encoders:
+ V..... = Video
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC (codec h264)
+ V....D mpeg4                MPEG-4 part 2
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+
+HWACCELS = """Hardware acceleration methods:
+cuda
+"""
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Fake subprocess.run: ffmpeg without nvenc/vaapi, no nvidia-smi."""
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd[0])
+        if cmd[0] == "nvidia-smi":
+            raise FileNotFoundError(cmd[0])
+        out = ENCODERS if "-encoders" in cmd else HWACCELS
+        return subprocess.CompletedProcess(cmd, 0, stdout=out, stderr="")
+
+    monkeypatch.setattr(hwaccel.subprocess, "run", run)
+    monkeypatch.setattr(hwaccel.HWAccel, "_caps", None)
+    return calls
+
+
+def test_probes_once(probes):
+    hwaccel.HWAccel.encoder(False)
+    first = list(probes)
+    hwaccel.HWAccel.encoder(True)
+    hwaccel.HWAccel.detect()
+    assert sorted(first) == ["ffmpeg", "ffmpeg", "nvidia-smi"]
+    assert probes == first
+
+
+def test_refresh_probes_again(probes):
+    hwaccel.HWAccel.detect()
+    hwaccel.HWAccel.detect(refresh=True)
+    assert len(probes) == 6
+
+
+def test_picks_libx264(probes):
+    caps = hwaccel.HWAccel.detect()
+    assert caps.gpus == 0 and caps.gpu_free_mb == ()
+    assert "libx264" in caps.encoders and "h264_nvenc" not in caps.encoders
+
+    enc = hwaccel.HWAccel.encoder(False)
+    assert (enc.name, enc.core) == ("libx264", "CPU")
+    assert enc.input_args == [] and enc.output_args == ["-c:v", "libx264"]
+
+    lossless = hwaccel.HWAccel.encoder(True)
+    assert lossless.output_args == ["-c:v", "libx264", "-preset", "slow", "-qp", "0"]